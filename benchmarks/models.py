@@ -0,0 +1,89 @@
+from typing import Callable, Dict, Tuple
+import torch
+from torch import nn, Tensor
+from torchvision.models import alexnet, vgg16
+
+class Plain(nn.Module):
+    """depth convolutions with width channels, downsampled after every quarter"""
+
+    def __init__(self, depth=16, width=32) -> None:
+        super().__init__()
+        layers = [nn.Conv2d(3, width, 3, padding=1), nn.ReLU()]
+        for i in range(1, depth):
+            layers += [nn.Conv2d(width, width, 3, padding=1), nn.ReLU()]
+            if i % max(1, depth // 4) == 0:
+                layers.append(nn.MaxPool2d(2))
+        self.features = nn.Sequential(*layers)
+        self.pool = nn.AdaptiveAvgPool2d(1)
+        self.fc = nn.Linear(width, 10)
+
+    def forward(self, x: Tensor) -> Tensor:
+        return self.fc(torch.flatten(self.pool(self.features(x)), 1))
+
+class BasicBlock(nn.Module):
+
+    def __init__(self, width: int) -> None:
+        super().__init__()
+        self.conv1 = nn.Conv2d(width, width, 3, padding=1, bias=False)
+        self.bn1 = nn.BatchNorm2d(width)
+        self.relu = nn.ReLU()
+        self.conv2 = nn.Conv2d(width, width, 3, padding=1, bias=False)
+        self.bn2 = nn.BatchNorm2d(width)
+
+    def forward(self, x: Tensor) -> Tensor:
+        out = self.relu(self.bn1(self.conv1(x)))
+        out = self.bn2(self.conv2(out))
+        return self.relu(out + x)
+
+class Residual(nn.Module):
+    """depth residual blocks with width channels"""
+
+    def __init__(self, depth=16, width=32) -> None:
+        super().__init__()
+        self.stem = nn.Sequential(nn.Conv2d(3, width, 3, padding=1), nn.ReLU(), nn.MaxPool2d(2))
+        self.blocks = nn.Sequential(*[BasicBlock(width) for _ in range(depth)])
+        self.pool = nn.AdaptiveAvgPool2d(1)
+        self.fc = nn.Linear(width, 10)
+
+    def forward(self, x: Tensor) -> Tensor:
+        return self.fc(torch.flatten(self.pool(self.blocks(self.stem(x))), 1))
+
+class TransformerBlock(nn.Module):
+
+    def __init__(self, width: int, heads: int) -> None:
+        super().__init__()
+        self.norm1 = nn.LayerNorm(width)
+        self.attn = nn.MultiheadAttention(width, heads, batch_first=True)
+        self.norm2 = nn.LayerNorm(width)
+        self.fc1 = nn.Linear(width, 4 * width)
+        self.act = nn.GELU()
+        self.fc2 = nn.Linear(4 * width, width)
+        self.drop = nn.Dropout(0.1)
+
+    def forward(self, x: Tensor) -> Tensor:
+        y = self.norm1(x)
+        x = x + self.attn(y, y, y, need_weights=False)[0]
+        return x + self.drop(self.fc2(self.act(self.fc1(self.norm2(x)))))
+
+class Transformer(nn.Module):
+    """depth pre-norm transformer blocks on tokens of size width"""
+
+    def __init__(self, depth=16, width=64, heads=4, vocab=1000) -> None:
+        super().__init__()
+        self.embedding = nn.Embedding(vocab, width)
+        self.blocks = nn.Sequential(*[TransformerBlock(width, heads) for _ in range(depth)])
+        self.norm = nn.LayerNorm(width)
+        self.head = nn.Linear(width, vocab)
+
+    def forward(self, x: Tensor) -> Tensor:
+        return self.head(self.norm(self.blocks(self.embedding(x))))
+
+# name: (constructor taking depth and width, input constructor, extra arguments of Architecture)
+MODELS: Dict[str, Tuple[Callable[[int, int], nn.Module], Callable[[], Tensor], dict]] = {
+    'plain': (lambda depth, width: Plain(depth, width), lambda: torch.rand(1, 3, 64, 64), {}),
+    'residual': (lambda depth, width: Residual(depth, width), lambda: torch.rand(1, 3, 64, 64), {}),
+    'transformer': (lambda depth, width: Transformer(depth, width), lambda: torch.randint(0, 1000, (1, 32)),
+                    {'ignore_layers': ['batchnorm', 'flatten', 'normalization']}),
+    'vgg16': (lambda depth, width: vgg16(), lambda: torch.rand(1, 3, 224, 224), {}),
+    'alexnet': (lambda depth, width: alexnet(), lambda: torch.rand(1, 3, 224, 224), {})
+}
@@ -0,0 +1,163 @@
+"""Benchmarks of capturing, laying out and rendering architectures.
+
+    python -m benchmarks.run --models plain residual --depth 8 64 --output results.json
+    python -m benchmarks.run --compare results.json
+"""
+import argparse
+import json
+import os.path as osp
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List
+import torch
+
+file_path = osp.dirname(osp.abspath(__file__))
+sys.path.append(osp.join(file_path, '..'))
+
+from pytorch2tikz import Architecture, __version__
+from benchmarks.models import MODELS
+
+# models which do not depend on depth and width
+FIXED = ('vgg16', 'alexnet')
+
+def _median(f: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        f()
+        times.append(perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+def _capture(model: torch.nn.Module, x: torch.Tensor, kwargs: dict, timings: Dict[str, float] = None) -> str:
+    """captures one forward pass and renders it, timings gets the duration of each step"""
+    timings = {} if timings is None else timings
+
+    start = perf_counter()
+    arch = Architecture(model, capture_once=True, **kwargs)
+    timings['register_s'] = perf_counter() - start
+
+    start = perf_counter()
+    model(x)
+    timings['capture_s'] = perf_counter() - start
+
+    start = perf_counter()
+    arch.relayout()
+    timings['layout_s'] = perf_counter() - start
+
+    start = perf_counter()
+    tex = arch.get_tex()
+    timings['tex_s'] = perf_counter() - start
+
+    start = perf_counter()
+    arch.get_tex()
+    timings['tex_cached_s'] = perf_counter() - start
+
+    timings['blocks'] = len(arch._block_sequence.blocks)
+    timings['tex_bytes'] = len(tex.encode())
+    timings['tex_folded_bytes'] = len(arch.get_tex(fold=True).encode())
+    arch.close()
+    return tex
+
+def measure(name: str, depth: int, width: int, repeat: int, image_dir: str) -> Dict:
+    constructor, make_input, kwargs = MODELS[name]
+    torch.manual_seed(0)
+    model = constructor(depth, width).eval()
+    x = make_input()
+    kwargs = dict(kwargs, image_path=osp.join(image_dir, f'{name}_{{i}}.png'), image_workers=0)
+
+    result = {
+        'model': name,
+        'depth': None if name in FIXED else depth,
+        'width': None if name in FIXED else width,
+        'modules': sum(1 for _ in model.modules())
+    }
+
+    with torch.inference_mode():
+        result['forward_s'] = _median(lambda: model(x), repeat)
+
+        # every pass is captured while the hooks are registered
+        arch = Architecture(model, **kwargs)
+        result['hooked_forward_s'] = _median(lambda: model(x), repeat)
+        result['hook_overhead_s'] = result['hooked_forward_s'] - result['forward_s']
+        arch.detach()
+
+        runs = []
+        for _ in range(repeat):
+            timings = {}
+            _capture(model, x, kwargs, timings)
+            runs.append(timings)
+        for k in runs[0].keys():
+            result[k] = sorted(r[k] for r in runs)[len(runs) // 2]
+
+        # allocations of the python heap, measured in a separate run as tracing slows down everything else
+        tracemalloc.start()
+        _capture(model, x, kwargs)
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+def _commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=file_path, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(models: List[str], depths: List[int], widths: List[int], repeat: int) -> Dict:
+    results = []
+    with tempfile.TemporaryDirectory() as image_dir:
+        for name in models:
+            configs = [(depths[0], widths[0])] if name in FIXED else [(d, w) for d in depths for w in widths]
+            for depth, width in configs:
+                result = measure(name, depth, width, repeat, image_dir)
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+
+    return {
+        'version': __version__,
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'platform': platform.platform(),
+        'threads': torch.get_num_threads(),
+        'results': results
+    }
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """ratio current / baseline of every timing and size of the configurations in both results"""
+    key = lambda r: (r['model'], r['depth'], r['width'])
+    old = {key(r): r for r in baseline['results']}
+    lines = []
+    for r in current['results']:
+        b = old.get(key(r))
+        if b is None:
+            continue
+        ratios = ' '.join(f'{k}={r[k] / b[k]:.2f}' for k in r.keys() if (k.endswith('_s') or k.endswith('_bytes')) and b.get(k))
+        lines.append(f'{r["model"]} depth={r["depth"]} width={r["width"]}: {ratios}')
+    return lines
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark capturing, layout and tex generation')
+    parser.add_argument('--models', nargs='+', default=list(MODELS.keys()), choices=list(MODELS.keys()))
+    parser.add_argument('--depth', nargs='+', type=int, default=[8, 32])
+    parser.add_argument('--width', nargs='+', type=int, default=[32])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results as JSON to this path instead of stdout')
+    parser.add_argument('--compare', help='print the ratios to the results in this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.models, args.depth, args.width, args.repeat)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            print('\n'.join(compare(json.load(f), results)), file=sys.stderr)
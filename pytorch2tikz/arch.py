@@ -1,13 +1,54 @@
-from typing import Tuple, Union
-import numpy as np
+from contextlib import contextmanager, nullcontext
+import gzip
+import os.path as osp
+import warnings
+from typing import IO, Any, Callable, Dict, Generator, Iterable, List, Tuple, Union
 from torch import Tensor, nn
 import torch
+from torch.nn.modules.module import register_module_forward_hook, register_module_forward_pre_hook
 
+from . import ir
 from .block.abcs import Block, Connection
 from .block.factory import BlockFactory
 from .block.sequence import BlockSequence
+from .block.tex import End, MemoryStrip
+from .cache import TraceCache
 from .constants import COLOR_VALUES
-from .module_graph import create_module_graph
+from .fx import module_calls, trace_graph
+from .images import ImageWriter
+from .latency import LatencyRecorder, LatencyStats, colormap as map_color
+from .lod import CallGrouper, group_modules
+from .memory import MemoryRecorder, aliases_input, output_bytes, tensor_bytes, timeline
+from .module_graph import module_graph
+from .profiler import ScopeNames, profile_times, scope_key
+from .provenance import ProvenanceMap, flatten_tensors
+from .recorder import EventLog
+from .registry import LayerInfo, LayerRegistry
+from .stats import Stats
+from .utils import format_bytes, hex_to_tex_color
+
+# settings of the layout by their attribute names in BlockFactory
+LAYOUT_SETTINGS = {
+    'block_offset': 'offset',
+    'height_depth_factor': 'height_depth_factor',
+    'width_factor': 'width_factor',
+    'linear_factor': 'linear_factor'
+}
+
+@contextmanager
+def _moved(module: nn.Module, device: Union[str, torch.device]):
+    """moves module to device for the duration of the with block. Afterwards its original parameters and buffers are put back,
+    as moving back from the meta device would not restore their data"""
+    saved = [(m, dict(m._parameters), dict(m._buffers), [(p, p.data) for p in m._parameters.values() if p is not None]) for m in module.modules()]
+    module.to(device)
+    try:
+        yield module
+    finally:
+        for m, parameters, buffers, data in saved:
+            m._parameters.update(parameters)
+            m._buffers.update(buffers)
+            for p, d in data:
+                p.data = d
 
 class Architecture:
 
@@ -19,59 +60,420 @@ class Architecture:
                  linear_factor=0.8,
                  image_path='./input_{i}.png',
                  ignore_layers=['batchnorm', 'flatten'],
-                 colors=COLOR_VALUES) -> None:
+                 colors=COLOR_VALUES,
+                 max_depth: int = None,
+                 max_passes: int = None,
+                 capture_once=False,
+                 global_hook=False,
+                 record=False,
+                 cache_dir: str = None,
+                 cache_size=256 * 2**20,
+                 image_workers=2,
+                 image_dpi: float = None,
+                 dedupe_images=False,
+                 image_atlas=False,
+                 collect_stats=False,
+                 stats_callback: Callable[[Dict[str, Any]], None] = None,
+                 profile=False,
+                 memory=False) -> None:
         self._handles = []
         self.module = module
 
-        _block_factory = BlockFactory(block_offset, height_depth_factor, width_factor, linear_factor, image_path)
-        self._block_sequence = BlockSequence(_block_factory, ignore_layers, colors)
+        self.global_hook = global_hook
+        self._module_ids = set()
+
+        self.max_passes = 1 if capture_once else max_passes
+        self.passes = 0
+        # whether a failure to capture a call was reported
+        self._failed = False
+
+        self._settings = {
+            'block_offset': block_offset,
+            'height_depth_factor': height_depth_factor,
+            'width_factor': width_factor,
+            'linear_factor': linear_factor,
+            'image_path': image_path,
+            'ignore_layers': ignore_layers,
+            'colors': colors,
+            'max_depth': max_depth
+        }
+        self._stats = Stats(collect_stats or stats_callback is not None, stats_callback)
+        self._registry = LayerRegistry(ignore_layers)
+        self._registry.stats = self._stats
+        atlas = image_path.replace('{i}', 'atlas') if image_atlas else None
+        self.images = ImageWriter(image_workers, image_dpi, dedupe_images, atlas)
+        self.images.stats = self._stats
+        self._block_sequence = self._create_sequence()
+        self._grouper = self._create_grouper()
+
+        # in record mode the hooks only log the calls, blocks are created by build()
+        self.log = EventLog() if record else None
+
+        self.cache = TraceCache(cache_dir, cache_size) if cache_dir is not None else None
+
+        # wall time of the hooked modules, see heatmap()
+        self.latency = LatencyRecorder() if profile else None
+        # measurements by block name, kept when the modules are detached
+        self._block_latencies: Union[Dict[str, List[LatencyStats]], None] = None
+        # activation and parameter bytes of the hooked modules, see annotate_memory()
+        self.memory = MemoryRecorder() if memory else None
+        self._block_memory = None
+        # original captions and the annotations added to them by block name
+        self._captions: Dict[str, str] = {}
+        self._notes: Dict[str, Dict[str, str]] = {}
+        # drawn after the blocks and connections
+        self._overlays = {}
+        # names of the modules in profiler traces, see import_profile()
+        self._scopes = ScopeNames()
+        self._scope_blocks: Union[Dict[str, str], None] = None
+        # stand-in modules of the functional ops traced with backend 'fx'. Blocks and connections only reference modules weakly
+        self._functional: List[nn.Module] = []
 
         self.inputs = []
 
-        self._last_data_ptr = None
+        # producers of the live tensors, None marks an input of the root module
+        self._provenance = ProvenanceMap()
+        self._sources_of = {}
+        self._edges = []
+        self._last_module = None
         self._last_block = None
 
-        self.register_handles()
+        if module is not None:
+            self.register_handles()
+
+    @classmethod
+    def from_ir(cls, file: Union[str, IO], format: str = None, **kwargs) -> 'Architecture':
+        """creates an Architecture without module from an IR written by dump_ir. Blocks are only decoded when they are accessed.
+        kwargs are passed to the constructor, e.g. colors"""
+        arch = cls(None, **kwargs)
+        ir.decode(ir.load(file, format), arch._block_sequence)
+        return arch
+
+    def dump_ir(self, file: Union[str, IO], format: str = None):
+        """writes the captured blocks and connections as JSON or msgpack (format 'json' or 'msgpack', guessed from the file extension if not given)"""
+        ir.dump(ir.encode(self._block_sequence), file, format)
     
+    def _create_sequence(self) -> BlockSequence:
+        s = self._settings
+        self._registry.ignore_layers = s['ignore_layers']
+        block_factory = BlockFactory(s['block_offset'], s['height_depth_factor'], s['width_factor'], s['linear_factor'], s['image_path'], self._registry, self.images)
+        block_factory.stats = self._stats
+        return BlockSequence(block_factory, s['ignore_layers'], s['colors'])
+
+    def _create_grouper(self) -> Union[CallGrouper, None]:
+        max_depth = self._settings['max_depth']
+        if max_depth is None:
+            return None
+        if self.module is None:
+            raise RuntimeError('max_depth requires the module')
+        return CallGrouper(group_modules(module_graph(self.module), max_depth))
+
     def register_handles(self):
-        root = create_module_graph(self.module)
+        graph = module_graph(self.module)
         self.remove_handles()
 
         modules = []
-        for c in root.bfs():
-            if 'torch.nn.modules' in str(type(c.module)):
-                handle = c.module.register_forward_hook(self)
-                self._handles.append(handle)
+        for c in graph:
+            if self._registry.classify(c.module).hooked:
                 modules.append(c.module)
+
+        if self.global_hook:
+            # a single hook for all modules, calls of modules outside of self.module are filtered by id
+            self._module_ids = set(id(m) for m in modules)
+            self._handles.append(register_module_forward_hook(self._global_forward))
+            if self.latency is not None:
+                self._handles.append(register_module_forward_pre_hook(self._global_forward_pre))
+        else:
+            for m in modules:
+                self._handles.append(m.register_forward_hook(self))
+                if self.latency is not None:
+                    self._handles.append(m.register_forward_pre_hook(self.latency.start))
+
+        # the hooks of the root module run before and after all others and mark the start and end of a forward pass
+        self._handles.append(self.module.register_forward_pre_hook(self._start_pass))
+        self._handles.append(self.module.register_forward_hook(self._end_pass))
+
+    def register_layer(self, cls: type, block: type = None, **kwargs) -> LayerInfo:
+        """registers a custom layer class to be drawn as block. For the keyword arguments see LayerRegistry.register"""
+        info = self._registry.register(cls, block, **kwargs)
+        if len(self._handles) > 0:
+            self.register_handles()
+        return info
+
+    def _global_forward(self, module: nn.Module, input: Union[Tensor, Tuple[Tensor]], output: Union[Tensor, Tuple[Tensor]]) -> None:
+        if id(module) in self._module_ids:
+            self(module, input, output)
+
+    def _global_forward_pre(self, module: nn.Module, input: Tuple[Tensor]) -> None:
+        if id(module) in self._module_ids:
+            self.latency.start(module)
+
+    def _start_pass(self, module: nn.Module, input: Tuple[Tensor]) -> None:
+        self._provenance.clear()
+        for t in flatten_tensors(input):
+            self._provenance.add(t, None)
+
+    def _end_pass(self, module: nn.Module, input: Union[Tensor, Tuple[Tensor]], output: Union[Tensor, Tuple[Tensor]]) -> None:
+        try:
+            if self.log is not None:
+                self.log.end_pass()
+            else:
+                self._finish_pass()
+        except Exception as e:
+            self._capture_failed(e)
+        if self.memory is not None:
+            self.memory.end_pass()
+        self._provenance.clear()
+        self.passes += 1
+        self._report()
+
+        if self.max_passes is not None and self.passes >= self.max_passes:
+            self.remove_handles()
     
     def remove_handles(self):
         if len(self._handles) > 0:
             for h in self._handles:
                 h.remove()
             self._handles = []
+
+    def detach(self) -> 'Architecture':
+        """removes the hooks and drops all references to the module and its submodules, so the model can be freed while the figure is still edited and rendered.
+        In record mode the blocks are built first if build() was not called. Capturing is not possible afterwards"""
+        self.remove_handles()
+        if self.log is not None:
+            if len(self._block_sequence.blocks) == 0:
+                self.build()
+            self.log = None
+
+        if self.latency is not None:
+            self._block_latencies = self._latency_stats()
+        self._scope_blocks = self._scope_names()
+        if self.memory is not None:
+            self._block_memory = self._memory_blocks()
+        self._block_sequence.detach()
+        self._functional = []
+        self._provenance.clear()
+        self._sources_of = {}
+        self._edges = []
+        self._last_module = None
+        self._module_ids = set()
+        self._grouper = None
+        self.module = None
+        return self
+
+    @contextmanager
+    def capture(self):
+        """registers the hooks for the duration of the with block and removes them afterwards"""
+        if len(self._handles) == 0:
+            self.register_handles()
+        try:
+            yield self
+        finally:
+            self.remove_handles()
+
+    def trace(self, input_shape: Tuple[int], device='meta', dtype=torch.float32, backend='hook') -> 'Architecture':
+        """runs the module once on a zero input of shape input_shape. On the meta device no weights are allocated and no kernels are executed, so only the shapes are captured.
+        The module is moved to device during the trace and keeps its parameters and buffers afterwards. The input is synthetic, so input blocks get placeholders instead of images.
+        backend is either 'hook' to capture with the registered forward hooks or 'fx' to capture from a symbolically traced graph.
+        The hooks are registered afterwards as they were before, with backend 'fx' they are removed during the trace.
+        If a cache_dir was given, a trace of the same structure, input shape and settings is loaded from the cache instead, together with the
+        memory measurements and the module names for import_profile(). Latencies are measured by running the module, so with profile=True
+        the cache is not used"""
+        use_cache = self.cache is not None and self.latency is None
+        if use_cache:
+            key = self._cache_key(input_shape, device, dtype, backend)
+            entry = self.cache.load(key)
+            if entry is not None:
+                state, recorders = entry
+                ir.decode(state, self._block_sequence)
+                self._scope_blocks = recorders['scopes']
+                if self.memory is not None:
+                    self._block_memory = recorders['memory']
+                    self.memory.cumulative = sum(c[1] for c in self._block_memory['calls'])
+                self.passes += 1
+                return self
+
+        if backend not in ('fx', 'hook'):
+            raise ValueError(f'unknown backend {backend}')
+
+        factory = self._block_sequence.block_factory
+        x = torch.zeros(input_shape, dtype=dtype, device=device)
+        hooked = len(self._handles) > 0
+        factory.placeholder_images = True
+        try:
+            with _moved(self.module, device):
+                if backend == 'fx':
+                    # the forward hooks would fire again during shape propagation
+                    self.remove_handles()
+                    self._trace_fx(x)
+                else:
+                    with torch.no_grad(), nullcontext() if hooked else self.capture():
+                        self.module(x)
+        finally:
+            factory.placeholder_images = False
+            if backend == 'fx' and hooked and (self.max_passes is None or self.passes < self.max_passes):
+                self.register_handles()
+
+        if use_cache:
+            recorders = {'scopes': self._scope_names()}
+            if self.memory is not None:
+                recorders['memory'] = self._memory_blocks()
+            self.cache.store(key, ir.encode(self._block_sequence), recorders)
+
+        return self
+
+    def _cache_key(self, input_shape: Tuple[int], device: Union[str, torch.device], dtype: torch.dtype, backend: str) -> str:
+        images = (self.images.dpi, self.images.dedupe, self.images.atlas)
+        settings = dict(self._settings, device=torch.device(device), dtype=dtype, backend=backend, images=images, memory=self.memory is not None, custom_layers=sorted(str(c) for c in self._registry.custom.keys()))
+        return self.cache.key(self.module, input_shape, settings)
+
+    def _trace_fx(self, *inputs: Tensor):
+        graph_module = trace_graph(self.module, *inputs, leaf_modules=tuple(self._registry.custom.keys()))
+
+        # functional ops are called with stand-in modules which do not show up in profiles
+        owned = set(id(m) for m in graph_module.modules())
+        for module, input, output, sources, scope in module_calls(graph_module):
+            if id(module) in owned:
+                self._scopes.add(module)
+            else:
+                self._functional.append(module)
+                if self._grouper is not None and scope != '':
+                    # functional ops inside a module at max_depth belong to its group
+                    group = self._grouper.groups.get(self.module.get_submodule(scope))
+                    if group is not None:
+                        self._grouper.groups[module] = group
+            if self.memory is not None:
+                self.memory.add(module, 0 if aliases_input(module) else tensor_bytes([output]), sources)
+            self._group_call(module, input, output.shape, sources)
+        if self.memory is not None:
+            self.memory.end_pass()
+
+        self._finish_pass()
+        self.passes += 1
+        self._report()
+
+    def _finish_pass(self):
+        if self._grouper is not None:
+            for call in self._grouper.flush():
+                self._capture_call(*call)
+        self._block_sequence.end_pass()
+
+        seen = self._block_sequence._seen_modules
+        for src, dst in self._edges:
+            dst_block = seen.get(dst)
+            if dst_block is None:
+                continue
+
+            # ignored modules are replaced by the modules producing their input
+            srcs, visited = [src], set()
+            while len(srcs) > 0:
+                s = srcs.pop()
+                if s is None or s in visited:
+                    continue
+                visited.add(s)
+                if s in seen:
+                    if seen[s] is not dst_block:
+                        self._block_sequence.connect(seen[s], dst_block)
+                else:
+                    srcs.extend(self._sources_of.get(s, []))
+
+        self._edges = []
+        self._sources_of = {}
+        self._last_module = None
     
+    def build(self, **settings) -> 'Architecture':
+        """creates the blocks from the calls recorded in record mode. The recorded calls are kept, so build can be called again with different settings,
+        e.g. build(block_offset=4, width_factor=0.5) or build(max_depth=1) for another level of detail. Accepts the same settings as the constructor from block_offset to max_depth"""
+        if self.log is None:
+            raise RuntimeError('build() requires an Architecture created with record=True')
+
+        for k in settings.keys():
+            if k not in self._settings:
+                raise TypeError(f'unknown setting {k}')
+        self._settings.update(settings)
+        self._block_sequence = self._create_sequence()
+        self._grouper = self._create_grouper()
+
+        self._edges = []
+        self._sources_of = {}
+        self._last_module = None
+        for module, in_shape, out_shape, sources, sample in self.log:
+            if module is None:
+                self._finish_pass()
+                continue
+
+            input = sample if sample is not None else torch.empty(in_shape, device='meta')
+            self._group_call(module, input, out_shape, sources)
+
+        self._report()
+        return self
+
     def __call__(self, module: nn.Module, input: Union[Tensor, Tuple[Tensor]], output: Union[Tensor, Tuple[Tensor]]) -> None:
-        # unpack tuple if output is tuple (e.g. for LSTMs)
-        if type(output) == tuple:
-            output = output[0]
-        input = input[0]
-    
-        # get current shapes
-        in_shape = input.shape
-        out_shape = output.shape
-        in_ptr = input.data_ptr()
-        out_ptr = output.data_ptr()
+        try:
+            if self.latency is not None:
+                self.latency.stop(module)
+            with self._stats.timed('hook'):
+                self._hook(module, input, output)
+        except Exception as e:
+            self._capture_failed(e)
+
+    def _capture_failed(self, e: Exception):
+        """the hooks run inside the forward pass of the model, so a call which cannot be captured (e.g. of a layer without block) is dropped
+        instead of breaking the forward pass. Only the first failure is reported"""
+        if not self._failed:
+            self._failed = True
+            warnings.warn(f'capturing a module call failed, it is not drawn: {e!r}')
+
+    def _hook(self, module: nn.Module, input: Union[Tensor, Tuple[Tensor]], output: Union[Tensor, Tuple[Tensor]]) -> None:
+        self._scopes.add(module)
+        inputs = flatten_tensors(input)
+        outputs = flatten_tensors(output)
+        if len(inputs) == 0 or len(outputs) == 0:
+            return
+
+        sources = self._provenance.sources(inputs)
+        for t in outputs:
+            self._provenance.add(t, module)
+        if self.memory is not None:
+            self.memory.add(module, output_bytes(outputs, inputs), sources)
+
+        if self.log is not None:
+            self.log.record(module, inputs[0], outputs[0], sources)
+        else:
+            self._group_call(module, inputs[0], outputs[0].shape, sources)
 
-        last_in_equals_out = False
+    def _group_call(self, module: nn.Module, input: Tensor, out_shape: Tuple[int], sources: List[Union[nn.Module, None]]):
+        """adds a call of module, with max_depth calls inside a module at max_depth are merged into one call of this module"""
+        if self._grouper is None:
+            self._capture_call(module, input, out_shape, sources)
+            return
+        for call in self._grouper.push(module, input, out_shape, sources):
+            self._capture_call(*call)
 
-        if self._last_data_ptr is not None:
-            last_in_equals_out = self._last_data_ptr == in_ptr or 'activation' in str(type(module))
+    def _capture_call(self, module: nn.Module, input: Tensor, out_shape: Tuple[int], sources: List[Union[nn.Module, None]]):
+        """adds a call of module to the block sequence. sources are the modules which produced its inputs, None stands for an input of the root module"""
+        self._sources_of[module] = sources
 
-        self._last_data_ptr = out_ptr
+        # inputs of unknown origin (e.g. results of functional ops) continue the previous module
+        last_module = self._last_module
+        chained = last_module is not None and (None not in sources or any(s is last_module for s in sources) or self._registry.classify(module).activation)
+        self._capture(module, input, out_shape, chained)
+
+        # data flow which does not follow the order of execution, e.g. residual connections
+        for s in sources:
+            if s is not None and s is not last_module:
+                self._edges.append((s, module))
+        self._last_module = module
+
+    def _capture(self, module: nn.Module, input: Tensor, out_shape: Tuple[int], chained: bool):
+        """adds module to the block sequence. If chained is False the input of module gets its own input block"""
+        in_shape = input.shape
+        pooling = self._registry.classify(module).pooling
 
         # set inputs
-        if not last_in_equals_out:
-            self._block_sequence.append_input(input, module)
+        if not chained:
+            with self._stats.timed('append_input'):
+                self._block_sequence.append_input(input, module)
 
         # check if tensor shape is equal to previous tensor shape, if not start new grouped blocks
         try:
@@ -80,15 +482,30 @@ class Architecture:
             same_depth = False
 
         # if not same_depth add gap
-        if not same_depth and 'pooling' not in str(type(module)):
+        if not same_depth and not pooling:
             self._block_sequence.add_gap()
 
         # add current module to blocks
-        self._block_sequence.append(module, out_shape)
+        with self._stats.timed('append'):
+            self._block_sequence.append(module, out_shape)
 
-        if 'pooling' in str(type(module)):
+        if pooling:
             self._block_sequence.add_gap()
     
+    def relayout(self, strategy='incremental', target_width: float = None, **settings) -> 'Architecture':
+        """recomputes the scale factors and offsets of the captured blocks without capturing again.
+        strategy is 'incremental' (scaling relative to the previous block), 'uniform' (no scaling) or a function, see layout.incremental.
+        If target_width is given the blocks are scaled to span target_width centimeters. settings can change block_offset, width_factor, height_depth_factor and linear_factor"""
+        factory = self._block_sequence.block_factory
+        for k, v in settings.items():
+            if k not in LAYOUT_SETTINGS:
+                raise TypeError(f'unknown layout setting {k}')
+            setattr(factory, LAYOUT_SETTINGS[k], v)
+        self._settings.update(settings)
+
+        self._block_sequence.layout(strategy, target_width)
+        return self
+
     def remove_block(self, name: str):
         self._block_sequence.remove_block(name)
 
@@ -104,15 +521,244 @@ class Architecture:
     def disconnect(self, block1: Union[Block, str], block2: Union[Block, str]):
         self._block_sequence.disconnect(block1, block2)
 
-    def get_tex(self) -> str:
-        out = ''
-        for b in self._block_sequence:
-            out += f'\n{str(b)}'
-        return out
+    def iter_tex(self, fold=False) -> Generator[str, None, None]:
+        """yields the tex code element by element. Waits until the input images are written first.
+        If fold is True, repeated sequences of blocks are drawn only once with a '×N' label"""
+        self.images.wait()
+        elements = self._block_sequence.folded() if fold else self._block_sequence
+        for b in elements:
+            # overlays refer to all blocks, which are not drawn when folded
+            if isinstance(b, End) and not fold:
+                for overlay in self._overlays.values():
+                    yield f'\n{str(overlay)}'
+            with self._stats.timed('tex'):
+                tex = f'\n{str(b)}'
+            yield tex
+
+    def get_tex(self, fold=False) -> str:
+        return ''.join(self.iter_tex(fold))
     
-    def save(self, file_path: str):
-        with open(file_path, 'w') as f:
-            f.write(self.get_tex())
+    def save(self, file: Union[str, IO], compress: bool = None, fold=False):
+        """streams the tex code to a path or a writable stream. Paths ending with .gz are gzip compressed unless compress is given,
+        streams have to be binary if compress is True. Files are written as UTF-8. For fold see iter_tex"""
+        if isinstance(file, str):
+            if compress is None:
+                compress = file.endswith('.gz')
+            f = gzip.open(file, 'wt', encoding='utf-8') if compress else open(file, 'w', encoding='utf-8')
+        elif compress:
+            start = file.tell() if self._stats.enabled else 0
+            f = gzip.open(file, 'wt', encoding='utf-8')
+        else:
+            f = nullcontext(file)
+
+        with f as out:
+            for tex in self.iter_tex(fold):
+                out.write(tex)
+                if not compress:
+                    self._stats.written('tex', len(tex.encode()))
+        if compress and self._stats.enabled:
+            # the size of the compressed data is known once it is flushed
+            self._stats.written('tex', osp.getsize(file) if isinstance(file, str) else file.tell() - start)
+        self._report()
+
+    def close(self):
+        """waits until all input images are written and stops the image writer threads"""
+        self.images.close()
+
+    def stats(self, reset=False) -> Dict[str, Any]:
+        """overhead of capturing and rendering, collected if the Architecture was created with collect_stats or stats_callback.
+        'times' has the cumulative seconds and 'counts' the number of calls of each phase: hook (the forward hook), classify (first
+        classification of a module class), append_input, create_input, append, flush, flush_connections, create (blocks), save_image (in the
+        image writer threads) and tex (rendering of each element). 'bytes_written' has the bytes of the images and of the tex code
+        written by save(), compressed if it is written with gzip. If reset is True, the times and counts start from zero afterwards"""
+        out = dict(self._stats.snapshot(), **self._totals())
+        if reset:
+            self._stats.reset()
+        return out
+
+    def _totals(self) -> Dict[str, int]:
+        # connections are resolved lazily, pending ones may turn out to be duplicates
+        return {
+            'passes': self.passes,
+            'blocks': len(self._block_sequence.blocks),
+            'connections': len(self._block_sequence._connections),
+            'pending_connections': len(self._block_sequence._connection_buffer)
+        }
+
+    def latencies(self, statistic='mean') -> Dict[str, float]:
+        """seconds per block measured with profile=True. statistic is 'mean', 'total' or a percentile like 'p90' of the calls of each module,
+        blocks of several modules (e.g. ConvActivationBlock or a module at max_depth) get the sum of their modules"""
+        if self.latency is None:
+            raise RuntimeError('latencies() requires an Architecture created with profile=True')
+        return {name: sum(s.get(statistic) for s in stats) for name, stats in self._latency_stats().items()}
+
+    def _latency_stats(self) -> Dict[str, List[LatencyStats]]:
+        if self._block_latencies is not None:
+            return self._block_latencies
+
+        out = {}
+        for module, stats in list(self.latency.stats.items()):
+            block = self._block_of(module)
+            if block is not None:
+                out.setdefault(block.name, []).append(stats)
+        return out
+
+    def _block_of(self, module: nn.Module) -> Union[Block, None]:
+        """the block drawing module, also if it is part of a module at max_depth"""
+        if self._grouper is not None:
+            module = self._grouper.groups.get(module, module)
+        return self._block_sequence._seen_modules.get(module)
+
+    def _scope_names(self) -> Dict[str, str]:
+        """block names by the names of modules in profiles, i.e. 'Conv2d_0' and qualified names like 'layer1.0.conv1'"""
+        if self._scope_blocks is not None:
+            return self._scope_blocks
+
+        out = {}
+        for name, module in list(self._scopes.modules.items()):
+            block = self._block_of(module)
+            if block is not None:
+                out[name] = block.name
+        if self.module is not None:
+            for name, module in self.module.named_modules():
+                block = self._block_of(module)
+                if name != '' and block is not None:
+                    out.setdefault(name, block.name)
+        return out
+
+    def import_profile(self, source: Union[str, IO, Iterable[Any]], statistic='total') -> Dict[str, float]:
+        """seconds per block from a profile recorded without the hooks, to be passed to heatmap(latencies=...).
+        source is the path (or stream) of a Chrome trace exported by torch.profiler, which is parsed event by event, a key_averages() result
+        or the table printed from it. Module events ('nn.Module: Conv2d_0', recorded with with_stack=True) are mapped by the order of the
+        first call of each module class, record_function scopes by the qualified name of a module or the name of a block.
+        Module events are only contained in traces, key_averages() and its table only work with record_function scopes of the modules.
+        statistic is 'total' or 'mean' (per call), blocks of several modules get the sum of their modules. Warns if no block is matched"""
+        if statistic not in ('total', 'mean'):
+            raise ValueError(f'unknown statistic {statistic}')
+
+        names = self._scope_names()
+        out = {}
+        for scope, (total, count) in profile_times(source).items():
+            key = scope_key(scope)
+            block = names.get(key, key if key in self._block_sequence._ids else None)
+            if block is None:
+                continue
+            out[block] = out.get(block, 0.0) + (total if statistic == 'total' else total / max(count, 1))
+
+        if len(out) == 0:
+            warnings.warn('no profiled scope matches a block. key_averages() and its table contain no module events, '
+                          'record the modules with record_function or pass the exported Chrome trace instead')
+        return out
+
+    def heatmap(self,
+                statistic='mean',
+                colormap: Union[str, List[str], Callable[[float], str]] = 'heat',
+                annotate=True,
+                latencies: Dict[str, float] = None) -> 'Architecture':
+        """colors each block by its share of the latency (see latencies), from the lowest to the highest color of colormap.
+        colormap is the name of a map in constants.COLORMAPS, a list of hex colors or a function from [0, 1] to a hex color.
+        If annotate is True the share is added to the caption. Blocks without measurements keep their color.
+        latencies are seconds by block name used instead of the measurements, e.g. from import_profile. Names without block are skipped with a warning"""
+        if latencies is None:
+            latencies = self.latencies(statistic)
+        total = sum(latencies.values())
+        highest = max(latencies.values(), default=0.0)
+        to_color = colormap if callable(colormap) else lambda v: map_color(colormap, v)
+
+        blocks = self._named_blocks(latencies.keys())
+        for name, seconds in latencies.items():
+            if name not in blocks:
+                continue
+            block = blocks[name]
+            block.args['fill'] = f'{{{hex_to_tex_color(to_color(seconds / highest if highest > 0 else 0.0))}}}'
+            if annotate:
+                share = seconds / total * 100 if total > 0 else 0.0
+                self._annotate(block, 'latency', f'{share:.1f}\\%')
+        return self
+
+    def _named_blocks(self, names: Iterable[str]) -> Dict[str, Block]:
+        """the blocks by name, names without block (e.g. of removed blocks) are left out with a warning"""
+        out, missing = {}, []
+        for name in names:
+            block = self.get_block(name)
+            if block is None:
+                missing.append(name)
+            else:
+                out[name] = block
+        if len(missing) > 0:
+            warnings.warn(f'no block named {", ".join(missing)}, skipping')
+        return out
+
+    def _annotate(self, block: Block, key: str, text: str):
+        """sets the annotation key of the caption of block, annotations are appended to the original caption"""
+        caption = self._captions.setdefault(block.name, block.args['caption'])
+        notes = self._notes.setdefault(block.name, {})
+        notes[key] = text
+        block.args['caption'] = ' '.join([caption.strip(), *notes.values()]).strip()
+
+    def _memory_blocks(self) -> Dict[str, Any]:
+        """activation and parameter bytes by block name and the calls of the first pass with the name of their block"""
+        if self._block_memory is not None:
+            return self._block_memory
+
+        blocks = {}
+        for module, nbytes in list(self.memory.activations.items()):
+            block = self._block_of(module)
+            if block is None:
+                continue
+            activation, parameters = blocks.get(block.name, (0, 0))
+            blocks[block.name] = (max(activation, nbytes), parameters + self.memory.parameters.get(module, 0))
+
+        calls = []
+        for module, nbytes, srcs in self.memory.calls:
+            block = self._block_of(module()) if module() is not None else None
+            calls.append((None if block is None else block.name, nbytes, srcs))
+        return {'blocks': blocks, 'calls': calls}
+
+    def memory_usage(self, mode='cumulative') -> Dict[str, Dict[str, int]]:
+        """bytes by block name measured with memory=True: 'activation' is the largest output of the modules of the block, 'parameters' the sum
+        of their parameters and 'timeline' the activation memory of the first pass up to the block. With mode 'cumulative' all outputs are kept,
+        as they are for the backward pass when training, with 'live' outputs are freed after their last use, as in inference.
+        The timeline includes the modules without block (e.g. ignored layers) and later calls of reused modules before the block"""
+        if self.memory is None:
+            raise RuntimeError('memory_usage() requires an Architecture created with memory=True')
+
+        summary = self._memory_blocks()
+        out = {name: {'activation': a, 'parameters': p} for name, (a, p) in summary['blocks'].items()}
+        highest = 0
+        for (name, _, _), value in zip(summary['calls'], timeline(summary['calls'], mode)):
+            highest = max(highest, value)
+            # later calls of reused modules count towards the next block
+            if name is not None and name in out and 'timeline' not in out[name]:
+                out[name]['timeline'] = highest
+                highest = 0
+        return out
+
+    def annotate_memory(self, mode='cumulative', strip=True, height=2.0) -> 'Architecture':
+        """adds the activation and parameter bytes (see memory_usage) to the caption of each block. If strip is True, bars below the figure
+        show the activation memory over the forward pass and label its peak. The strip is not drawn with fold=True.
+        Measurements of removed blocks are skipped with a warning"""
+        usage = self.memory_usage(mode)
+        blocks = self._named_blocks(usage.keys())
+        for name, u in usage.items():
+            if name not in blocks:
+                continue
+            note = format_bytes(u['activation'])
+            if u['parameters'] > 0:
+                note += f' / {format_bytes(u["parameters"])} params'
+            self._annotate(blocks[name], 'memory', note)
+
+        self._overlays.pop('memory', None)
+        if strip:
+            bars = [(b.name, usage[b.name]['timeline']) for b in self._block_sequence.blocks if 'timeline' in usage.get(b.name, {})]
+            if len(bars) > 0:
+                peak = max(bars, key=lambda bar: bar[1])
+                self._overlays['memory'] = MemoryStrip(bars, peak[0], f'{format_bytes(peak[1])} ({mode})', height)
+        return self
+
+    def _report(self):
+        if self._stats.callback is not None:
+            self._stats.report(**self._totals())
     
     def __repr__(self) -> str:
         out = 'Architecture[\n'
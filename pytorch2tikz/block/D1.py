@@ -2,6 +2,7 @@ from .abcs import Block
 from ..constants import COLOR, PICTYPE
 
 class LinearBlock(Block):
+    __slots__ = ()
 
     def __init__(self, name, **kwargs) -> None:
         kwargs['dim'] = 1
@@ -12,6 +13,7 @@ class LinearBlock(Block):
                          **kwargs)
 
 class LinearActivationBlock(Block):
+    __slots__ = ()
 
     def __init__(self, name, **kwargs) -> None:
         kwargs['dim'] = 1
@@ -24,6 +26,7 @@ class LinearActivationBlock(Block):
                          **kwargs)
 
 class EmbeddingBlock(Block):
+    __slots__ = ()
 
     def __init__(self, name, **kwargs) -> None:
         kwargs['dim'] = 1
@@ -34,6 +37,7 @@ class EmbeddingBlock(Block):
                          **kwargs)
 
 class LSTMBlock(Block):
+    __slots__ = ()
 
     def __init__(self, name, **kwargs) -> None:
         kwargs['dim'] = 1
@@ -1,12 +1,15 @@
 from __future__ import annotations
 from enum import Enum
-from typing import Iterable, Tuple, Union
+from collections.abc import MutableMapping
+from typing import Iterable, List, Tuple, Union
 import numpy as np
 from abc import abstractmethod
 
 from ..constants import DEFAULT_VALUE, DIM_FACTOR, CM_FACTOR, OFFSET, COLOR, PICTYPE
 
 class TexElement:
+    __slots__ = ()
+
     @property
     @abstractmethod
     def tex(self):
@@ -18,7 +21,90 @@ class TexElement:
     def __str__(self) -> str:
         return self.tex
 
+class BlockStore:
+    """numeric fields of many blocks in shared arrays. Row i holds the offset, scale factor and size of the block with index i,
+    blocks only keep a reference to the store and their index. A missing size is stored as nan"""
+
+    def __init__(self, capacity=64) -> None:
+        self.offsets = np.zeros((capacity, 3))
+        self.scale_factors = np.zeros((capacity, 3))
+        self.sizes = np.full((capacity, 3), np.nan)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.scale_factors.nbytes + self.sizes.nbytes
+
+    def _grow(self):
+        capacity = len(self.offsets)
+        self.offsets = np.concatenate((self.offsets, np.zeros((capacity, 3))))
+        self.scale_factors = np.concatenate((self.scale_factors, np.zeros((capacity, 3))))
+        self.sizes = np.concatenate((self.sizes, np.full((capacity, 3), np.nan)))
+
+    def allocate(self) -> int:
+        if self._size == len(self.offsets):
+            self._grow()
+        i = self._size
+        self._size += 1
+        return i
+
+def _view(a: np.ndarray) -> np.ndarray:
+    # views are read-only, so in-place changes cannot bypass the tex cache
+    a = a.view()
+    a.flags.writeable = False
+    return a
+
+def _number(v: np.float64) -> Union[int, float]:
+    return int(v) if v.is_integer() else float(v)
+
+MISSING = object()
+
+# arguments which are stored in slots of the block, the sizes are stored in the BlockStore. Other arguments follow in order of insertion
+ARG_SLOTS = {'fill': '_fill', 'opacity': '_opacity', 'caption': '_caption', 'bandfill': '_bandfill'}
+SIZE_ARGS = ('width', 'height', 'depth')
+ARG_ORDER = ('fill', 'opacity', 'caption', *SIZE_ARGS, 'bandfill')
+
+class TexArgs(MutableMapping):
+    """arguments of a block. Changes are written to the block and invalidate its cached tex"""
+    __slots__ = ('_block',)
+
+    def __init__(self, block: Block) -> None:
+        self._block = block
+
+    def __getitem__(self, key):
+        v = self._block._get_arg(key)
+        if v is MISSING:
+            raise KeyError(key)
+        return v
+
+    def __setitem__(self, key, value):
+        self._block._set_arg(key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._block._set_arg(key, MISSING)
+
+    def __iter__(self):
+        block = self._block
+        for k in ARG_ORDER:
+            if block._get_arg(k) is not MISSING:
+                yield k
+        if block._extra is not None:
+            yield from block._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
 class Block(TexElement):
+    __slots__ = ('name', 'pictype', 'to', 'looped', 'xlabel', 'ylabel', 'zlabel', '_dim', '_default_size', '_size_dim',
+                 '_fill', '_opacity', '_caption', '_bandfill', '_extra', '_tex', '_store', '_index')
     
     def __init__(self,
                  name,
@@ -35,11 +121,13 @@ class Block(TexElement):
                  caption = " ",
                  xlabel = True,
                  ylabel = False,
-                 zlabel = True) -> None:
+                 zlabel = True,
+                 store: BlockStore = None) -> None:
         super().__init__()
+        self._attach(BlockStore(1) if store is None else store)
         self.name = name
         self.pictype = pictype
-        self.offset = np.array(offset)
+        self.offset = offset
         self.to = to
         self.looped = False
         self.xlabel = xlabel
@@ -62,14 +150,95 @@ class Block(TexElement):
         if bandfill is not None:
             self.args["bandfill"] = bandfill
 
+    def _attach(self, store: BlockStore):
+        """moves the numeric fields of the block to a new row of store. Blocks created by __new__ are initialized empty"""
+        i = store.allocate()
+        old = getattr(self, '_store', None)
+        if old is None:
+            self._tex = None
+            self._extra = None
+            for slot in ARG_SLOTS.values():
+                setattr(self, slot, MISSING)
+        else:
+            store.offsets[i] = old.offsets[self._index]
+            store.scale_factors[i] = old.scale_factors[self._index]
+            store.sizes[i] = old.sizes[self._index]
+        self._store = store
+        self._index = i
+
+    def __setattr__(self, name: str, value) -> None:
+        super().__setattr__(name, value)
+        if name != '_tex':
+            super().__setattr__('_tex', None)
+
+    def _get_arg(self, key: str):
+        if key in ARG_SLOTS:
+            return getattr(self, ARG_SLOTS[key])
+        if key in SIZE_ARGS:
+            v = self._store.sizes[self._index, SIZE_ARGS.index(key)]
+            return MISSING if np.isnan(v) else _number(v)
+        if self._extra is None:
+            return MISSING
+        return self._extra.get(key, MISSING)
+
+    def _set_arg(self, key: str, value):
+        if key in ARG_SLOTS:
+            setattr(self, ARG_SLOTS[key], value)
+        elif key in SIZE_ARGS:
+            self._store.sizes[self._index, SIZE_ARGS.index(key)] = np.nan if value is MISSING else value
+        elif value is MISSING:
+            del self._extra[key]
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        self._tex = None
+
+    @property
+    def args(self) -> TexArgs:
+        return TexArgs(self)
+
+    @args.setter
+    def args(self, args: dict):
+        for slot in ARG_SLOTS.values():
+            setattr(self, slot, MISSING)
+        self._store.sizes[self._index] = np.nan
+        self._extra = None
+        for k, v in args.items():
+            self._set_arg(k, v)
+
+    @property
+    def offset(self) -> np.ndarray:
+        return _view(self._store.offsets[self._index])
+
+    @offset.setter
+    def offset(self, offset: Iterable[float]):
+        self._store.offsets[self._index] = offset
+        self._tex = None
+
+    @property
+    def scale_factor(self) -> np.ndarray:
+        return _view(self._store.scale_factors[self._index])
+
+    @scale_factor.setter
+    def scale_factor(self, scale_factor: Iterable[float]):
+        self._store.scale_factors[self._index] = scale_factor
+        self._tex = None
+
     @property
     def dim(self) -> int:
         return self._dim
     
     @dim.setter
     def dim(self, dim: int):
-        self.default_size = [self._default_size] * 3
-        self.default_size[-dim:] = [None] * dim
+        self._size_dim = dim
+
+    @property
+    def default_size(self) -> List[Union[int, None]]:
+        """default size of each dimension, None for the last dim dimensions which are given by the output shape"""
+        default_size = [self._default_size] * 3
+        default_size[-self._size_dim:] = [None] * self._size_dim
+        return default_size
 
     @property
     def size(self) -> Tuple[int]:
@@ -77,23 +246,31 @@ class Block(TexElement):
     
     @size.setter
     def size(self, size: Iterable[int]):
-        for i, dim in enumerate(['width', 'height', 'depth']):
-            if self.default_size[i] is None:
+        default_size = self.default_size
+        for i, dim in enumerate(SIZE_ARGS):
+            if default_size[i] is None:
                 self.args[dim] = size[i]
             else:
-                self.args[dim] = self.default_size[i] * DIM_FACTOR
+                self.args[dim] = default_size[i] * DIM_FACTOR
 
     @property
     def tex(self) -> str:
+        """rendered tex, cached until a property of the block changes"""
+        if self._tex is None:
+            self._tex = self.render()
+        return self._tex
+
+    def render(self) -> str:
+        labels = {}
         if self.dim == 3 and self.xlabel:
-            self.args['xlabel'] = f'{{{self.size[0]},}}'
+            labels['xlabel'] = f'{{{self.size[0]},}}'
         if self.dim >= 2 and self.ylabel:
-            self.args['ylabel'] = f'{self.size[1]}'
+            labels['ylabel'] = f'{self.size[1]}'
         if self.dim >= 1 and self.zlabel:
-            self.args['zlabel'] = f'{self.size[2]}'
+            labels['zlabel'] = f'{self.size[2]}'
 
         args = ''
-        for k, v in self.args.items():
+        for k, v in {**self.args, **labels}.items():
             if isinstance(v, Enum):
                 v = v.value
             elif type(v) in [tuple, list] and isinstance(v[0], Enum):
@@ -122,18 +299,31 @@ class Block(TexElement):
 
 
 class FlatBlock(Block):
+    __slots__ = ()
+
     def __init__(self, name, dim=3, **kwargs) -> None:
         super().__init__(name, dim=max(1, dim-1), **kwargs)
 
 class Connection(TexElement):
-    
+    __slots__ = ('block1', 'block2', '_tex', '_tex_key')
+
     def __init__(self, block1: Block, block2: Block) -> None:
         super().__init__()
         self.block1 = block1
         self.block2 = block2
+        self._tex = None
+        self._tex_key = None
 
     @property
     def tex(self) -> str:
+        """rendered tex, cached until one of the connected blocks is renamed"""
+        key = (self.block1.name, self.block2.name)
+        if self._tex is None or self._tex_key != key:
+            self._tex = self.render()
+            self._tex_key = key
+        return self._tex
+
+    def render(self) -> str:
         return f"""\draw [connection] ({self.block1.name}-east) -- node {{\midarrow}} ({self.block2.name}-west);"""
     
     
@@ -1,12 +1,15 @@
 import numpy as np
 from torch import Tensor, nn
-from torchvision.utils import save_image
 from typing import Tuple, Union, Iterable
 import os.path as osp
 
-from .abcs import Block
+from .abcs import Block, BlockStore
 from .inputs import ImgInputBlock, VecInputBlock
-from ..mapping import BLOCK_MAPPING
+from ..images import ImageWriter
+from ..layout import Layout
+from ..lod import ModuleGroup
+from ..registry import LayerRegistry
+from ..stats import DISABLED, Stats
 from ..constants import DEFAULT_VALUE, DIM_FACTOR
 
 class BlockFactory:
@@ -15,35 +18,48 @@ class BlockFactory:
                  height_depth_factor=0.8,
                  width_factor=0.8,
                  linear_factor=0.8,
-                 image_path='input_{i}.png') -> None:
+                 image_path='input_{i}.png',
+                 registry: LayerRegistry = None,
+                 images: ImageWriter = None) -> None:
         self.offset = offset
         self.height_depth_factor = height_depth_factor
         self.width_factor = width_factor
         self.linear_factor = linear_factor
         self.image_path = image_path
+        self.registry = LayerRegistry() if registry is None else registry
+        self.images = ImageWriter() if images is None else images
 
         self.to = (0,0,0)
-        self.current_offset = np.zeros(3)
+        # gaps since the last block in multiples of offset
+        self.current_gaps = np.zeros(3)
         self.last_block_id = 0
-        self.last_block_size = None
-        self.scale_factor = None
+        self.layout = Layout()
+        # shared arrays for the numeric fields of the created blocks, set by BlockSequence
+        self.store: BlockStore = None
+        self.stats: Stats = DISABLED
+        # inputs without meaningful content (e.g. the zeros of Architecture.trace) get placeholders as well
+        self.placeholder_images = False
     
     def _get_block_type(self, module: nn.Module, dim=None) -> Tuple[type, int]:
-        if module.__class__.__name__.lower().endswith('d'):
-            dim = int(module.__class__.__name__[-2]) + 1
-        
-        for key, value in BLOCK_MAPPING.items():
-            if key in str(type(module)):
-                return value, dim
-        
-        raise Exception(f'could not found Block for {module}')
+        info = self.registry.classify(module)
+        if info.block is None:
+            raise Exception(f'could not found Block for {module}')
+
+        return info.block, info.dim if info.dim is not None else dim
 
     def create(self, block: Union[type, Block], i: int, output_shape: Iterable[int]) -> Block:
-        kwargs = {}
+        with self.stats.timed('create'):
+            return self._create(block, i, output_shape)
+
+    def _create(self, block: Union[type, Block], i: int, output_shape: Iterable[int]) -> Block:
         dim = None
+        kwargs = {}
 
         # set dim and if block is not a type get its type
         if not isinstance(block, type):
+            # aggregated modules (see lod.ModuleGroup) are labeled with the class of the module
+            if isinstance(block, ModuleGroup):
+                kwargs['caption'] = block.caption
             block, dim = self._get_block_type(block)
 
         if dim is None:
@@ -52,78 +68,69 @@ class BlockFactory:
             else:
                 dim = len(output_shape) - 1
         
-        # set size
+        # set size, scale factors and offsets are computed by the layout
         size = np.array([DEFAULT_VALUE, DEFAULT_VALUE, DEFAULT_VALUE])
         size[-dim:] = np.array(output_shape)[-dim:]
-        if self.last_block_size is not None:
-            _size = size.copy()
-            _size[:-dim] = 0
-            scale_diff = _size / self.last_block_size
-            scale_diff[scale_diff == 1] = 0
-
-            width_factor = -self.width_factor / 2 / 2
 
-            scale_factor = scale_diff * np.array([width_factor, self.height_depth_factor, self.height_depth_factor])
-
-            if self.scale_factor is not None and scale_factor[0] != 0 and self.scale_factor[0] != 0:
-                self.scale_factor[0] -= self.scale_factor[0] * scale_factor[0] * 2
-            elif self.scale_factor is not None and scale_factor[0] != 0:
-                self.scale_factor[0] = scale_factor[0]
-    
-            if self.scale_factor is not None and np.all(scale_factor < 4):
-                self.scale_factor[1:] += scale_factor[1:]
-            # if scaling is too large use linear_factor for reduction
-            elif not np.all(scale_factor < 4):
-                self.scale_factor[1:] = -self.linear_factor
-            else:
-                self.scale_factor = np.clip(scale_factor, -1, 1)
-        
-        if self.scale_factor is not None:
-            kwargs['scale_factor'] = self.scale_factor.copy()
-            
-    
-        kwargs['dim'] = dim
-        
         new_block: Block = block(
                  i,
                  size = size,
-                 offset = self.current_offset,
-                 to = self.to, **kwargs)
+                 dim = dim,
+                 to = self.to,
+                 store = self.store,
+                 **kwargs)
+        self.layout.add(new_block, output_shape, dim, tuple(self.current_gaps))
 
         self.to = f'({new_block.name}-east)'
         self.last_block_id = i
-        self.last_block_size = size
-        self.current_offset = np.zeros(3)
+        self.current_gaps = np.zeros(3)
         return new_block
     
     def create_input(self, x: Tensor) -> Block:
+        with self.stats.timed('create_input'):
+            return self._create_input(x)
+
+    def _create_input(self, x: Tensor) -> Block:
         if isinstance(self.to, Block):
             to = f'({self.to.name}-east)'
         else:
             to = self.to
 
-        current_offset = np.array((-self.current_offset[0], self.offset, 0.0))
-
-        offset = tuple(self.current_offset + current_offset)
+        gaps = (0.0, 1.0 + self.current_gaps[1], self.current_gaps[2])
 
         if x.ndim > 3:
-            im_path = self.image_path.replace('{i}', str(self.last_block_id + 1))
-            save_image(x[0], im_path)
+            # tensors without data (e.g. on the meta device) get a placeholder instead of an image
+            if x.is_meta or self.placeholder_images:
+                im_path = file_name = None
+            else:
+                im_path = self.image_path.replace('{i}', str(self.last_block_id + 1))
+                file_name = osp.split(im_path)[1]
 
             new_block = ImgInputBlock(self.last_block_id + 1,
-                                      osp.split(im_path)[1],
+                                      file_name,
                                       to=to,
-                                      offset=offset,
-                                      size=np.array(x.shape[-3:]))
+                                      size=np.array(x.shape[-3:]),
+                                      store=self.store)
+            # the image writer may change the file of the block, e.g. for duplicates
+            if im_path is not None:
+                self.images.submit(x[0], im_path, new_block)
         else:
             new_block = VecInputBlock(self.last_block_id + 1,
                                       to=to,
-                                      offset=offset,
-                                      size=np.array([DEFAULT_VALUE, DEFAULT_VALUE, x.shape[-1]]))
+                                      size=np.array([DEFAULT_VALUE, DEFAULT_VALUE, x.shape[-1]]),
+                                      store=self.store)
 
+        self.layout.place(new_block, gaps)
         return new_block
     
     def add_gap(self, axis=0):
-        offset = np.zeros(3)
-        offset[axis] = self.offset
-        self.current_offset = self.current_offset + offset
\ No newline at end of file
+        self.current_gaps[axis] += 1
+
+    def apply_layout(self, strategy='incremental', target_width: float = None):
+        """sets the scale factors and offsets of all created blocks, see Layout.compute"""
+        self.layout.apply(block_offset=self.offset,
+                          width_factor=self.width_factor,
+                          height_depth_factor=self.height_depth_factor,
+                          linear_factor=self.linear_factor,
+                          strategy=strategy,
+                          target_width=target_width)
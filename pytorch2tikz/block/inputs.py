@@ -1,20 +1,36 @@
 
+from typing import Tuple
 from .abcs import Block
 from ..constants import CM_FACTOR, COLOR, DIM_FACTOR
 
 class ImgInputBlock(Block):
+    __slots__ = ('file_path', 'viewport')
 
-    def __init__(self, name, file_path, **kwargs) -> None:
+    def __init__(self, name, file_path, viewport: Tuple[int, int, int, int] = None, **kwargs) -> None:
         super().__init__(f'ImgInput_{name}', **kwargs)
         self.file_path = file_path
+        # region of the image file (llx, lly, urx, ury) in bp, e.g. in a texture atlas
+        self.viewport = viewport
     
-    @property
-    def tex(self) -> str:
+    def render(self) -> str:
+        width = self.args['depth'] / DIM_FACTOR / CM_FACTOR
+        height = self.args['height'] / DIM_FACTOR / CM_FACTOR
+
+        clip = ''
+        if self.viewport is not None:
+            clip = f', viewport={" ".join(str(v) for v in self.viewport)}, clip'
+
+        if self.file_path is None:
+            return f"""
+\\node[canvas is zy plane at x=0, draw, fill=white, minimum width={width}cm, minimum height={height}cm] ({self.name}) at {self.to} {{}};
+"""
+
         return f"""
-\\node[canvas is zy plane at x=0] ({self.name}) at {self.to} {{\includegraphics[width={self.args['depth'] / DIM_FACTOR / CM_FACTOR}cm, height={self.args['height'] / DIM_FACTOR / CM_FACTOR}cm]{{{self.file_path}}}}};
+\\node[canvas is zy plane at x=0] ({self.name}) at {self.to} {{\includegraphics[width={width}cm, height={height}cm{clip}]{{{self.file_path}}}}};
 """
 
 class VecInputBlock(Block):
+    __slots__ = ()
 
     def __init__(self, name, **kwargs) -> None:
         super().__init__(f'VecInput_{name}', COLOR.VEC_INPUT, dim=1, **kwargs)
@@ -1,16 +1,18 @@
-from typing import List, Generator, Dict, Tuple, Union
+from weakref import ReferenceType, WeakKeyDictionary, ref
+from typing import Iterable, List, Generator, Dict, MutableMapping, Set, Tuple, Union
 from torch import nn, Tensor
 import numpy as np
-import re
 
 from .factory import BlockFactory
-from .abcs import Block, Connection
+from .abcs import Block, BlockStore, Connection, TexElement
 from .Dn import ConvActivationBlock
 from .D1 import LinearActivationBlock
 from .inputs import ImgInputBlock
 from .connections import LoopConnection
 from .tex import Begin, End
 from ..constants import COLOR_VALUES
+from ..fold import fold
+from ..layout import Layout
 
 LOG_CREATED = True
 
@@ -22,29 +24,43 @@ class BlockSequence:
                  colors = COLOR_VALUES) -> None:
 
         self.buffer: List[nn.Module] = []
-        self.blocks: List[Block] = []
         self.last_block: Block = None
 
         self.block_factory = block_factory
+        self.store = BlockStore()
+        block_factory.store = self.store
         self.ignore_layers = ignore_layers
+        self.registry = block_factory.registry
+        self.registry.ignore_layers = ignore_layers
+        self.stats = block_factory.stats
 
-        self._fuseable_layers = ['conv', 'linear']
-        self._seen_modules: Dict[nn.Module, Block] = {}
-        self._block_map: Dict[str, Block] = {}
-        self._connection_map: Dict[str, Connection] = {}
-        self._connection_buffer: List[Tuple[Block, Union[Block, nn.Module]]] = []
+        # modules are only weakly referenced, so the blocks do not keep the model alive
+        self._seen_modules: MutableMapping[nn.Module, Block] = WeakKeyDictionary()
+
+        # blocks by id in insertion order, connections by pairs of ids with adjacency sets of ids per block
+        self._blocks: Dict[int, Block] = {}
+        self._ids: Dict[str, int] = {}
+        self._next_id = 0
+        self._connections: Dict[Tuple[int, int], Connection] = {}
+        self._out: Dict[int, Set[int]] = {}
+        self._in: Dict[int, Set[int]] = {}
+        self._connection_buffer: List[Tuple[Block, Union[Block, ReferenceType], type]] = []
         self._added_gap = False
         self._colors = colors
 
+        # scale factors and offsets are computed for all blocks at once before they are used
+        self._layout_options = {}
+        self._laid_out = True
+
     def append(self, module: nn.Module, output_shape: Tuple[int]):
         """appends the modules buffer if module should not be ignored ans was not seen before. If module is not fuseable call self.flush()"""
-        for l in self.ignore_layers:
-            if l in str(type(module)):
-                return
+        info = self.registry.classify(module)
+        if info.ignored:
+            return
 
-        if module in self._seen_modules.keys():
+        if module in self._seen_modules:
             mod_block = self._seen_modules[module]
-            if self.last_block is not None:
+            if self.last_block is not None and self.last_block is not mod_block:
                 if not mod_block.looped and not self.last_block.looped:
                     self.connect(self.last_block, mod_block)
 
@@ -55,27 +71,34 @@ class BlockSequence:
             return
 
         self.buffer.append((module, output_shape))
-        
-        fuseable = False
-        for l in self._fuseable_layers:
-            if l in str(type(module)):
-                fuseable = True
-                break
 
-        if not fuseable:
+        if not info.fuseable:
             self.flush()
     
+    @property
+    def blocks(self) -> Iterable[Block]:
+        return self._blocks.values()
+
+    def _add_block(self, block: Block):
+        self._laid_out = False
+        if block._store is not self.store:
+            block._attach(self.store)
+        i = self._next_id
+        self._next_id += 1
+        self._blocks[i] = block
+        self._ids[block.name] = i
+        self._out[i] = set()
+        self._in[i] = set()
+
     def append_input(self, x: Tensor, module: nn.Module):
-        if module not in self._seen_modules.keys():
+        if module not in self._seen_modules:
             input_block = self.block_factory.create_input(x)
-            self.blocks.append(input_block)
-            self._block_map[input_block.name] = input_block
+            self._add_block(input_block)
             self.connect(input_block, module)
 
 
     def append_block(self, block: Block):
-        self.blocks.append(block)
-        self._block_map[block.name] = block
+        self._add_block(block)
         if self.last_block is not None and self._added_gap:
             self.connect(self.last_block, block)
 
@@ -86,41 +109,44 @@ class BlockSequence:
         """translate modules in self.buffer to blocks in self.blocks and connections in self._connection_buffer"""
         if len(self.buffer) == 0:
             return
+        with self.stats.timed('flush'):
+            self._flush()
 
-        first_entry, out_shape = self.buffer[0]
-
-        # if buffer has only one entry add block
-        if len(self.buffer) == 1:
-            new_block = first_entry
-
-        elif len(self.buffer) == 2:
-            # if buffer has fuseable entries
-            fuse_conv = 'conv' in str(type(first_entry))
-            fuse_linear = 'linear' in str(type(first_entry))
-            fuseable = (fuse_conv or fuse_linear) and 'activation' in str(type(self.buffer[1][0]))
-
-            if fuse_conv and fuseable:
-                new_block = ConvActivationBlock
-            elif fuse_linear and fuseable:
-                new_block = LinearActivationBlock
-            else:
-                for m, out_shape in self.buffer:
-                    if m not in self._seen_modules.keys():
-                        new_block = self.block_factory.create(m, len(self.blocks), out_shape)
-                        self._seen_modules[m] = new_block
-                        self.append_block(new_block)
-                self.buffer = []
-                return
-        else:
-            raise Exception(f'buffer has untypical length of {len(self.buffer)}')
+    def _flush(self):
+        # conv and linear modules are fused with a directly following activation, all other modules get their own block.
+        # Without nn activation modules (e.g. with F.relu) several conv or linear modules are buffered in a row
+        # the buffer is emptied first, so a module which cannot be drawn is dropped with the rest of the buffer instead of failing again
+        buffer, self.buffer = self.buffer, []
+        i = 0
+        while i < len(buffer):
+            module, out_shape = buffer[i]
+            info = self.registry.classify(module)
+            if info.fuseable and i + 1 < len(buffer) and self.registry.classify(buffer[i + 1][0]).activation:
+                new_block = self.block_factory.create(ConvActivationBlock if info.conv else LinearActivationBlock, self._next_id, out_shape)
+                self.append_block(new_block)
+                for mod, _ in buffer[i:i + 2]:
+                    self._seen_modules[mod] = new_block
+                i += 2
+                continue
 
-        new_block = self.block_factory.create(new_block, len(self.blocks), out_shape)
-        self.append_block(new_block)
-        for mod, _ in self.buffer:
-            self._seen_modules[mod] = new_block
+            if module not in self._seen_modules:
+                new_block = self.block_factory.create(module, self._next_id, out_shape)
+                self._seen_modules[module] = new_block
+                self.append_block(new_block)
+            i += 1
+    
+    def end_pass(self):
+        """flushes the remaining modules at the end of a forward pass. The next pass does not continue from the last block"""
+        self.flush()
+        self.last_block = None
 
+    def detach(self):
+        """resolves the pending blocks and connections and drops all references to modules"""
+        self.flush()
+        self.flush_connections()
         self.buffer = []
-    
+        self._seen_modules.clear()
+
     def add_gap(self, axis=0):
         if self._added_gap == False:
             self._added_gap = True
@@ -132,27 +158,55 @@ class BlockSequence:
                 block1 = self._resolve_block(block1)
             if isinstance(block2, str):
                 block2 = self._resolve_block(block2)
+            elif isinstance(block2, nn.Module):
+                block2 = ref(block2)
     
             self._connection_buffer.append((block1, block2, conn_type))
     
     def disconnect(self, block1: Union[str, Block], block2: Union[str, Block]):
-        del self._connection_map[f'{self._resolve_block(block1).name}-{self._resolve_block(block2).name}']
+        self.flush_connections()
+        self._remove_connection(self._ids[self._resolve_block(block1).name], self._ids[self._resolve_block(block2).name])
+
+    def _remove_connection(self, i: int, j: int):
+        del self._connections[(i, j)]
+        self._out[i].discard(j)
+        self._in[j].discard(i)
     
+    def layout(self, strategy='incremental', target_width: float = None):
+        """computes the scale factors and offsets of all created blocks, see Layout.compute. The options are kept for blocks added later"""
+        if self.block_factory.layout is None:
+            raise RuntimeError('the layout of blocks loaded without their sizes and gaps (IR version 1) cannot be recomputed')
+        self._layout_options = {'strategy': strategy, 'target_width': target_width}
+        self._laid_out = False
+        self._apply_layout()
+
+    def _apply_layout(self):
+        if not self._laid_out and self.block_factory.layout is not None:
+            self.block_factory.apply_layout(**self._layout_options)
+            self._laid_out = True
+
     def get_block(self, name: str) -> Union[Block, None]:
-        if name in self._block_map.keys():
-            return self._block_map[name]
-        else:
+        self._apply_layout()
+        i = self._ids.get(name)
+        if i is None:
             return None
+        return self._blocks[i]
     
     def remove_block(self, block: Union[str, Block]):
         block = self._resolve_block(block)
-        self.blocks.remove(block)
-        del self._block_map[block.name]
         self.flush_connections()
-        
-        for c in self._connection_map:
-            if c.block1.name == block.name or c.block2.name == block.name:
-                self.disconnect(c.block1, c.block2)
+
+        i = self._ids.pop(block.name)
+        for j in list(self._out[i]):
+            self._remove_connection(i, j)
+        for j in list(self._in[i]):
+            self._remove_connection(j, i)
+
+        del self._blocks[i]
+        del self._out[i]
+        del self._in[i]
+        if self.block_factory.layout is not None:
+            self.block_factory.layout.remove(block)
 
     
     def _resolve_block(self, block: Union[Block, str]) -> Block:
@@ -161,36 +215,77 @@ class BlockSequence:
         else:
             return block
 
-    def flush_connections(self) -> List[Connection]:
+    def flush_connections(self):
+        if len(self._connection_buffer) == 0:
+            return
+        with self.stats.timed('flush_connections'):
+            self._flush_connections()
+
+    def _flush_connections(self):
         for b1, b2, conn_type in self._connection_buffer:
-            if isinstance(b1, nn.Module):
-                b1 = self._seen_modules[b1]
-            if isinstance(b2, nn.Module):
-                b2 = self._seen_modules[b2]
-            
-            if conn_type is None:
-                id1 = int(re.match('^\w+_(\d+)', b1.name).group(1))
-                id2 = int(re.match('^\w+_(\d+)', b2.name).group(1))
+            if isinstance(b2, ReferenceType):
+                # connections to modules which were freed or never added are dropped
+                module = b2()
+                b2 = self._seen_modules.get(module) if module is not None else None
+                if b2 is None:
+                    continue
 
-                if id1 > id2:
-                    conn_type = LoopConnection
-                else:
-                    conn_type = Connection
+            id1 = self._ids[b1.name]
+            id2 = self._ids[b2.name]
+            if (id1, id2) in self._connections:
+                continue
+
+            if conn_type is None:
+                conn_type = LoopConnection if id1 > id2 else Connection
 
-            if f'{b1.name}-{b2.name}' not in self._connection_map.keys():
-                self._connection_map[f'{b1.name}-{b2.name}'] = conn_type(b1, b2)
+            self._connections[(id1, id2)] = conn_type(b1, b2)
+            self._out[id1].add(id2)
+            self._in[id2].add(id1)
 
         self._connection_buffer = []
     
+    def state(self) -> Dict:
+        """returns the captured blocks and connections without references to modules"""
+        self.flush_connections()
+        self._apply_layout()
+        return {'blocks': list(self._blocks.values()), 'connections': list(self._connections.values())}
+
+    def load(self, blocks: MutableMapping[int, Block], ids: Dict[str, int], connections: MutableMapping[Tuple[int, int], Connection], layout: Layout = None):
+        """replaces the blocks and connections, e.g. by lazily decoded ones. blocks are given by id, ids maps block names to ids and connections are given by pairs of ids.
+        layout holds the sizes and gaps of the blocks, without it the layout cannot be recomputed"""
+        self.block_factory.layout = layout
+        self._blocks = blocks
+        self._ids = ids
+        self._next_id = max(ids.values(), default=-1) + 1
+        self._connections = connections
+        self._out = {i: set() for i in ids.values()}
+        self._in = {i: set() for i in ids.values()}
+        for i, j in connections.keys():
+            self._out[i].add(j)
+            self._in[j].add(i)
+        self._connection_buffer = []
+        self.last_block = None
+        self._laid_out = True
+
     def __getitem__(self, key) -> Block:
         return self.get_block(key)
 
+    def folded(self, max_period=32) -> Generator[TexElement, None, None]:
+        """like iter(self) but repeated subsequences of blocks are drawn once with a '×N' label, see fold.fold"""
+        self.flush_connections()
+        self._apply_layout()
+
+        yield Begin(self._colors)
+        yield from fold(self._blocks.values(), self._connections.values(), max_period)
+        yield End()
+
     def __iter__(self) -> Generator[Block, None, None]:
         self.flush_connections()
+        self._apply_layout()
         
         yield Begin(self._colors)
-        for b in self.blocks:
+        for b in self._blocks.values():
             yield b
-        for c in self._connection_map.values():
+        for c in self._connections.values():
             yield c
         yield End()
\ No newline at end of file
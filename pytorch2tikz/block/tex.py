@@ -1,5 +1,5 @@
 from .abcs import TexElement
-from typing import Dict
+from typing import Dict, List, Tuple
 from ..utils import hex_to_tex_color
 from ..constants import COLOR
 
@@ -353,4 +353,49 @@ class End(TexElement):
         return """
 \end{tikzpicture}
 \end{document}
-"""
\ No newline at end of file
+"""
+
+class RepeatLabel(TexElement):
+    """'×N' annotation above the first and last block of a folded repetition"""
+    __slots__ = ('first', 'last', 'count')
+
+    def __init__(self, first: str, last: str, count: int) -> None:
+        self.first = first
+        self.last = last
+        self.count = count
+
+    @property
+    def tex(self) -> str:
+        return f"""
+\\draw [densely dashed, draw=\\EdgeColor] ({self.first}-padded-northwest) -- ({self.last}-padded-northeast) node [midway, above, font=\\Large] {{$\\times {self.count}$}};
+"""
+
+class MemoryStrip(TexElement):
+    """bars below the blocks with the activation memory after each of them, the peak is highlighted and labeled"""
+    __slots__ = ('bars', 'peak', 'label', 'height', 'width')
+
+    def __init__(self, bars: List[Tuple[str, float]], peak: str, label: str, height=2.0, width=0.4) -> None:
+        self.bars = bars
+        self.peak = peak
+        self.label = label
+        self.height = height
+        self.width = width
+
+    @property
+    def tex(self) -> str:
+        if len(self.bars) == 0:
+            return ''
+
+        highest = max(v for _, v in self.bars)
+        out = '\n\\coordinate (memory-base) at ($(current bounding box.south)+(0,-1)$);\n'
+        for name, value in self.bars:
+            h = self.height * value / highest if highest > 0 else 0.0
+            fill = 'red!70' if name == self.peak else 'gray!40'
+            out += f'\\fill [{fill}] ($({name}-anchor |- memory-base)+({-self.width / 2},0)$) rectangle ++({self.width},{h:.3f});\n'
+            if name == self.peak:
+                out += f'\\node [above, font=\\small] at ($({name}-anchor |- memory-base)+(0,{h:.3f})$) {{{self.label}}};\n'
+
+        first, last = self.bars[0][0], self.bars[-1][0]
+        out += f'\\draw [draw=\\EdgeColor] ($({first}-anchor |- memory-base)+({-self.width},0)$) -- ($({last}-anchor |- memory-base)+({self.width},0)$)'
+        out += ' node [right, font=\\small] {activation memory};\n'
+        return out
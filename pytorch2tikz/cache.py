@@ -0,0 +1,109 @@
+from typing import Any, Dict, Iterable, Tuple, Union
+import hashlib
+import json
+import os
+import os.path as osp
+import shutil
+import tempfile
+import time
+from torch import nn
+
+from . import __version__
+from . import ir
+from .module_graph import module_graph
+
+STATE_FILE = 'trace.json'
+RECORDERS_FILE = 'recorders.json'
+
+def module_structure(module: nn.Module) -> str:
+    """describes the module tree with the class and hyperparameters of each module, one line per module"""
+    root = module_graph(module).root
+    if root is None:
+        return ''
+
+    lines = []
+    for node in root.dfs():
+        m = node.module
+        lines.append(f'{node.depth} {type(m).__module__}.{type(m).__qualname__}({m.extra_repr()})')
+    return '\n'.join(lines)
+
+class TraceCache:
+    """on-disk cache of captured architectures. Entries are addressed by a hash of the module structure, the input shape and the settings.
+    If the cache grows beyond max_bytes the least recently used entries are removed."""
+
+    def __init__(self, directory: str, max_bytes=256 * 2**20) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, module: nn.Module, input_shape: Iterable[int], settings: Dict[str, Any]) -> str:
+        h = hashlib.sha256()
+        h.update(__version__.encode())
+        h.update(module_structure(module).encode())
+        h.update(json.dumps([list(input_shape), settings], sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def _entry(self, key: str) -> str:
+        return osp.join(self.directory, key)
+
+    def _complete(self, entry: str) -> bool:
+        return osp.isfile(osp.join(entry, STATE_FILE)) and osp.isfile(osp.join(entry, RECORDERS_FILE))
+
+    def load(self, key: str) -> Union[Tuple[Dict[str, Any], Dict[str, Any]], None]:
+        """returns the stored IR state and recorder state or None"""
+        entry = self._entry(key)
+        if not self._complete(entry):
+            return None
+
+        state = ir.load(osp.join(entry, STATE_FILE))
+        with open(osp.join(entry, RECORDERS_FILE)) as f:
+            recorders = json.load(f)
+
+        # mark entry as recently used
+        now = time.time()
+        os.utime(entry, (now, now))
+        return state, recorders
+
+    def store(self, key: str, state: Dict[str, Any], recorders: Dict[str, Any]):
+        """stores the IR state and the state of the recorders, e.g. memory measurements. If another process stored the key in the meantime its entry is kept"""
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with open(osp.join(tmp, RECORDERS_FILE), 'w') as f:
+                json.dump(recorders, f)
+            ir.dump(state, osp.join(tmp, STATE_FILE))
+
+            entry = self._entry(key)
+            if osp.exists(entry) and not self._complete(entry):
+                shutil.rmtree(entry)
+            try:
+                os.replace(tmp, entry)
+            except OSError:
+                # the entry was filled by another process after load() missed
+                if not self._complete(entry):
+                    raise
+        finally:
+            if osp.exists(tmp):
+                shutil.rmtree(tmp)
+
+        self.evict(keep=key)
+
+    def _size(self, entry: str) -> int:
+        return sum(osp.getsize(osp.join(entry, name)) for name in os.listdir(entry))
+
+    def evict(self, keep: str = None):
+        """removes the least recently used entries until the cache fits into max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = osp.join(self.directory, name)
+            if name.startswith('.') or not osp.isdir(path):
+                continue
+            entries.append((osp.getmtime(path), name, self._size(path)))
+
+        total = sum(e[2] for e in entries)
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self._entry(name), ignore_errors=True)
+            total -= size
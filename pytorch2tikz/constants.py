@@ -13,6 +13,7 @@ class COLOR(Enum):
     
     NORM = "\\NormColor"
     LSTM = "\LstmColor"
+    MODULE = "\ModuleColor"
 
 COLOR_VALUES = {
     'CONV': '#ffd232',
@@ -26,9 +27,17 @@ COLOR_VALUES = {
     
     'NORM': "#c40000",
     'LSTM': "#000080",
+    'MODULE': "#808080",
     'EDGE': '#555555'
 }
 
+# colors from low to high values, used to color blocks by latency
+COLORMAPS = {
+    'heat': ['#ffffcc', '#ffeda0', '#fed976', '#feb24c', '#fd8d3c', '#fc4e2a', '#e31a1c', '#b10026'],
+    'viridis': ['#440154', '#482878', '#3e4989', '#31688e', '#26828e', '#1f9e89', '#35b779', '#6ece58', '#b5de2b', '#fde725'],
+    'gray': ['#f0f0f0', '#202020']
+}
+
 class PICTYPE(Enum):
     BOX = "Box"
     RIGHTBANDEDBOX = "RightBandedBox"
@@ -0,0 +1,115 @@
+import copy
+from typing import Dict, Generator, Hashable, List, Sequence, Tuple
+
+from .block.abcs import Block, Connection, TexElement
+from .block.connections import LoopConnection
+from .block.inputs import ImgInputBlock, VecInputBlock
+from .block.tex import RepeatLabel
+
+MOD = (1 << 61) - 1
+BASE = 1_000_003
+
+def _caption(block: Block) -> str:
+    """caption without the number of the block, which the default captions contain (e.g. 'Conv7' of block 'Conv_7')"""
+    caption = str(block.args.get('caption', ''))
+    return caption.replace(block.name.rsplit('_', 1)[-1], '', 1)
+
+def signature(block: Block) -> Hashable:
+    """blocks with the same signature are drawn identically apart from their position, name and number in the caption"""
+    args = block.args
+    return (type(block).__name__, block.pictype, block.dim, block.size, args.get('fill'), args.get('bandfill'), args.get('opacity'), _caption(block))
+
+def _codes(blocks: Sequence[Block]) -> List[int]:
+    codes: Dict[Hashable, int] = {}
+    out = []
+    for i, b in enumerate(blocks):
+        # inputs are never folded
+        key = ('input', i) if isinstance(b, (ImgInputBlock, VecInputBlock)) else signature(b)
+        out.append(codes.setdefault(key, len(codes) + 1))
+    return out
+
+def find_repeats(codes: Sequence[int], max_period=32) -> List[Tuple[int, int, int]]:
+    """finds consecutive repetitions of equal subsequences from left to right. At each position the repetition covering the most elements is taken.
+    Subsequences are compared by polynomial prefix hashes, so the search takes O(len(codes) * max_period) comparisons.
+    Returns (start, period, count) of each repetition"""
+    n = len(codes)
+    prefix = [0] * (n + 1)
+    powers = [1] * (n + 1)
+    for i, c in enumerate(codes):
+        prefix[i + 1] = (prefix[i] * BASE + c) % MOD
+        powers[i + 1] = powers[i] * BASE % MOD
+
+    def window(start: int, length: int) -> int:
+        return (prefix[start + length] - prefix[start] * powers[length]) % MOD
+
+    repeats = []
+    i = 0
+    while i < n:
+        best = (0, 0, 0)
+        for period in range(1, min(max_period, (n - i) // 2) + 1):
+            h = window(i, period)
+            count = 1
+            while i + (count + 1) * period <= n and window(i + count * period, period) == h:
+                count += 1
+            if count > 1 and period * count > best[1] * best[2]:
+                best = (i, period, count)
+
+        if best[2] > 1:
+            repeats.append(best)
+            i += best[1] * best[2]
+        else:
+            i += 1
+    return repeats
+
+def fold(blocks: Sequence[Block], connections: Sequence[Connection], max_period=32) -> Generator[TexElement, None, None]:
+    """yields the blocks and connections with repeated subsequences of blocks drawn only once with a '×N' label.
+    Blocks and connections of the hidden repetitions are mapped to their counterpart in the drawn one"""
+    blocks = list(blocks)
+    counterpart: Dict[int, Block] = {}
+    labels: List[RepeatLabel] = []
+    for start, period, count in find_repeats(_codes(blocks), max_period):
+        for i in range(start + period, start + period * count):
+            counterpart[id(blocks[i])] = blocks[start + (i - start) % period]
+        labels.append(RepeatLabel(blocks[start].name, blocks[start + period - 1].name, count))
+
+    if len(counterpart) == 0:
+        yield from blocks
+        yield from connections
+        return
+
+    position = {id(b): i for i, b in enumerate(blocks)}
+    names = {b.name: counterpart[id(b)].name for b in blocks if id(b) in counterpart}
+    # the block following a repetition is placed relative to the last drawn block
+    for b in blocks:
+        if id(b) in counterpart:
+            continue
+        if isinstance(b.to, str) and b.to[1:-len('-east)')] in names:
+            b = copy.copy(b)
+            b.to = f'({names[b.to[1:-len("-east)")]]}-east)'
+        yield b
+    yield from labels
+
+    seen = set()
+    for c in connections:
+        b1 = counterpart.get(id(c.block1), c.block1)
+        b2 = counterpart.get(id(c.block2), c.block2)
+        if b1 is c.block1 and b2 is c.block2:
+            key = (id(b1), id(b2))
+            if key not in seen:
+                seen.add(key)
+                yield c
+            continue
+
+        # connections from one repetition to the next one become loops and are dropped
+        forward = position[id(c.block1)] < position[id(c.block2)]
+        if b1 is b2 or forward and position[id(b1)] > position[id(b2)]:
+            continue
+        key = (id(b1), id(b2))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        conn_type = type(c)
+        if conn_type in (Connection, LoopConnection):
+            conn_type = LoopConnection if position[id(b1)] > position[id(b2)] else Connection
+        yield conn_type(b1, b2)
@@ -0,0 +1,93 @@
+from typing import Dict, Generator, List, Tuple, Union
+import torch
+from torch import nn, Tensor
+from torch.fx import GraphModule, Node, Tracer
+from torch.fx.passes.shape_prop import ShapeProp, TensorMetadata
+
+from .mapping import FUNCTION_MAPPING
+
+class _Tracer(Tracer):
+
+    def __init__(self, leaf_modules: Tuple[type] = ()) -> None:
+        super().__init__()
+        self.leaf_modules = leaf_modules
+
+    def is_leaf_module(self, m: nn.Module, module_qualified_name: str) -> bool:
+        return isinstance(m, self.leaf_modules) or super().is_leaf_module(m, module_qualified_name)
+
+def trace_graph(module: nn.Module, *inputs: Tensor, leaf_modules: Tuple[type] = ()) -> GraphModule:
+    """symbolically traces module and annotates every node with the shape of its output. Modules of the types in leaf_modules are not traced into"""
+    graph = _Tracer(leaf_modules).trace(module)
+    graph_module = GraphModule(module, graph)
+    ShapeProp(graph_module).propagate(*inputs)
+    return graph_module
+
+def _tensor_meta(node: Node) -> Union[TensorMetadata, None]:
+    meta = node.meta.get('tensor_meta')
+    # unpack nested outputs (e.g. for LSTMs)
+    while isinstance(meta, (tuple, list)) and not isinstance(meta, TensorMetadata):
+        if len(meta) == 0:
+            return None
+        meta = meta[0]
+    return meta
+
+def _node_module(graph_module: GraphModule, node: Node, functional: Dict[Node, nn.Module]) -> Union[nn.Module, None]:
+    if node.op == 'call_module':
+        return graph_module.get_submodule(node.target)
+
+    if node.op == 'call_function':
+        name = getattr(node.target, '__name__', None)
+    elif node.op == 'call_method':
+        name = node.target
+    else:
+        return None
+
+    if name not in FUNCTION_MAPPING:
+        return None
+
+    # functional ops get a stand-in module so they can be handled like their nn counterpart
+    if node not in functional:
+        functional[node] = FUNCTION_MAPPING[name]()
+    return functional[node]
+
+def _scope(node: Node) -> str:
+    """qualified name of the innermost module the node is called in, '' for the root"""
+    stack = node.meta.get('nn_module_stack')
+    if not stack:
+        return ''
+    return next(reversed(stack.values()))[0]
+
+def module_calls(graph_module: GraphModule) -> Generator[Tuple[nn.Module, Tensor, Tensor, List[Union[nn.Module, None]], str], None, None]:
+    """yields (module, input, output, sources, scope) for every module call in execution order.
+    sources are the modules which produced the input of the call, None stands for an input of the graph.
+    Inputs and outputs are empty tensors on the meta device carrying only shape and dtype.
+    scope is the qualified name of the innermost module of the traced module the call is made in, for functional ops the module calling them"""
+    sources: Dict[Node, List[Union[nn.Module, None]]] = {}
+    functional: Dict[Node, nn.Module] = {}
+
+    for node in graph_module.graph.nodes:
+        if node.op == 'placeholder':
+            sources[node] = [None]
+            continue
+
+        node_sources = []
+        for n in node.all_input_nodes:
+            for s in sources.get(n, []):
+                if s not in node_sources:
+                    node_sources.append(s)
+
+        module = _node_module(graph_module, node, functional)
+        in_node = node.args[0] if len(node.args) > 0 and isinstance(node.args[0], Node) else None
+        in_meta = _tensor_meta(in_node) if in_node is not None else None
+        out_meta = _tensor_meta(node)
+
+        if module is None or in_meta is None or out_meta is None:
+            # ops without a block pass on the producers of their inputs
+            sources[node] = node_sources
+            continue
+
+        input = torch.empty(in_meta.shape, dtype=in_meta.dtype, device='meta')
+        output = torch.empty(out_meta.shape, dtype=out_meta.dtype, device='meta')
+        yield module, input, output, node_sources, _scope(node)
+
+        sources[node] = [module]
@@ -0,0 +1,180 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import math
+import os.path as osp
+from threading import Lock
+from typing import Dict, List, Tuple, Union
+import torch
+from torch import Tensor
+import torch.nn.functional as F
+from torchvision.utils import save_image
+
+from .constants import CM_FACTOR, DIM_FACTOR
+from .stats import DISABLED, Stats
+
+CM_PER_INCH = 2.54
+
+def printed_size(x: Tensor) -> Tuple[float, float]:
+    """height and width in centimeters of an image (C, H, W) drawn by ImgInputBlock"""
+    return x.shape[-2] / DIM_FACTOR / CM_FACTOR, x.shape[-1] / DIM_FACTOR / CM_FACTOR
+
+def downscale(x: Tensor, dpi: float) -> Tensor:
+    """resizes the image (C, H, W) to its printed size at dpi if it is larger"""
+    height, width = (max(1, math.ceil(s / CM_PER_INCH * dpi)) for s in printed_size(x))
+    if height >= x.shape[-2] and width >= x.shape[-1]:
+        return x
+    return F.interpolate(x[None].float(), size=(min(height, x.shape[-2]), min(width, x.shape[-1])), mode='area')[0]
+
+def pack(shapes: List[Tuple[int, int]]) -> Tuple[List[Tuple[int, int]], Tuple[int, int]]:
+    """places rectangles of the given (height, width) in shelves. Returns the (top, left) corner of each rectangle and the (height, width) of the atlas"""
+    if len(shapes) == 0:
+        return [], (0, 0)
+
+    max_width = max(max(w for _, w in shapes), math.ceil(math.sqrt(sum(h * w for h, w in shapes))))
+    corners = [None] * len(shapes)
+    top = left = shelf = width = 0
+    for i in sorted(range(len(shapes)), key=lambda i: -shapes[i][0]):
+        h, w = shapes[i]
+        if left + w > max_width:
+            top += shelf
+            left = shelf = 0
+        corners[i] = (top, left)
+        left += w
+        shelf = max(shelf, h)
+        width = max(width, left)
+    return corners, (top + shelf, width)
+
+def _rgb(x: Tensor) -> Tensor:
+    if x.shape[0] >= 3:
+        return x[:3]
+    return x[:1].expand(3, *x.shape[1:])
+
+class ImageWriter:
+    """writes input images in background threads, so the forward pass is not blocked by copying and encoding them.
+    CUDA tensors are copied to pinned host memory without synchronizing the device. With max_workers=0 images are written immediately.
+
+    If dpi is given, images are downscaled to their printed size at this resolution. With dedupe identical images share one file,
+    with atlas all images are packed into a single image at this path which is clipped to the region of each block.
+    The final file name (and viewport) of each block is set when the image is processed, wait() has to be called before rendering.
+    Errors are raised by wait()"""
+
+    def __init__(self, max_workers=2, dpi: float = None, dedupe=False, atlas: str = None) -> None:
+        self.max_workers = max_workers
+        self.dpi = dpi
+        self.dedupe = dedupe
+        self.atlas = atlas
+
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._pending: List[Future] = []
+        self._lock = Lock()
+        self._files: Dict[str, str] = {}
+        self._regions: Dict[str, int] = {}
+        self._atlas_images: List[Tensor] = []
+        self._atlas_blocks: List[Tuple[object, int]] = []
+        self._atlas_written = 0
+        self.stats: Stats = DISABLED
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, x: Tensor, path: str, block=None):
+        """schedules writing the image x of shape (C, H, W) to path. block gets the file_path (and viewport) of the written image"""
+        if self.max_workers == 0:
+            self._process(x.detach(), path, block, None)
+            return
+
+        x = x.detach()
+        if x.is_cuda:
+            host = torch.empty(x.shape, dtype=x.dtype, pin_memory=True)
+            host.copy_(x, non_blocking=True)
+            copied = torch.cuda.Event()
+            copied.record()
+        else:
+            # the input may be changed in place by later layers
+            host = x.clone()
+            copied = None
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='pytorch2tikz-images')
+        self._pending.append(self._executor.submit(self._process, host, path, block, copied))
+
+    def _process(self, x: Tensor, path: str, block, copied: Union[torch.cuda.Event, None]):
+        if copied is not None:
+            copied.synchronize()
+        if self.dpi is not None:
+            x = downscale(x, self.dpi)
+
+        key = None
+        if self.dedupe:
+            data = x.float().contiguous().numpy()
+            key = hashlib.sha1(repr(data.shape).encode() + data.tobytes()).hexdigest()
+        elif self.atlas is not None:
+            key = path
+
+        if self.atlas is not None:
+            with self._lock:
+                region = self._regions.get(key)
+                if region is None:
+                    region = len(self._atlas_images)
+                    self._regions[key] = region
+                    self._atlas_images.append(x)
+                self._atlas_blocks.append((block, region))
+            return
+
+        if key is not None:
+            with self._lock:
+                written = self._files.get(key)
+                if written is None:
+                    self._files[key] = path
+            if written is not None:
+                if block is not None:
+                    block.file_path = osp.basename(written)
+                return
+
+        self._save(x, path)
+        if block is not None:
+            block.file_path = osp.basename(path)
+
+    def _save(self, x: Tensor, path: str):
+        with self.stats.timed('save_image'):
+            save_image(x, path)
+        if self.stats.enabled:
+            self.stats.written('images', osp.getsize(path))
+
+    def _write_atlas(self):
+        if len(self._atlas_blocks) == self._atlas_written:
+            return
+
+        images = [_rgb(x) for x in self._atlas_images]
+        corners, (height, width) = pack([tuple(x.shape[-2:]) for x in images])
+        atlas = torch.ones(3, height, width)
+        for (top, left), x in zip(corners, images):
+            atlas[:, top:top + x.shape[-2], left:left + x.shape[-1]] = x
+        self._save(atlas, self.atlas)
+
+        # viewports are given in bp from the lower left corner, images without resolution are included with one pixel per bp
+        file_name = osp.basename(self.atlas)
+        for block, region in self._atlas_blocks:
+            if block is None:
+                continue
+            (top, left), x = corners[region], images[region]
+            block.file_path = file_name
+            block.viewport = (left, height - top - x.shape[-2], left + x.shape[-1], height - top)
+        self._atlas_written = len(self._atlas_blocks)
+
+    def wait(self):
+        """blocks until all scheduled images are written"""
+        pending, self._pending = self._pending, []
+        for f in pending:
+            f.result()
+        if self.atlas is not None:
+            self._write_atlas()
+
+    def close(self):
+        """waits for the scheduled images and stops the threads"""
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,245 @@
+from collections.abc import Mapping, MutableMapping
+from enum import Enum
+from typing import IO, Any, Callable, Dict, Iterable, Union
+import json
+import numpy as np
+
+from .block.abcs import Block, BlockStore, Connection
+from .block.inputs import ImgInputBlock
+from .block.sequence import BlockSequence
+from .constants import COLOR, PICTYPE
+from .layout import Layout
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+IR_FORMAT = 'pytorch2tikz-ir'
+# version 2 adds the sizes and gaps of the layout
+IR_VERSION = 2
+
+ENUMS = {'COLOR': COLOR, 'PICTYPE': PICTYPE}
+
+def _subclasses(cls: type) -> Dict[str, type]:
+    out = {cls.__name__: cls}
+    for c in cls.__subclasses__():
+        out.update(_subclasses(c))
+    return out
+
+def _plain(v: Any) -> Any:
+    if isinstance(v, Enum):
+        return {type(v).__name__: v.name}
+    if isinstance(v, np.ndarray):
+        return [_plain(i) for i in v.tolist()]
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, (tuple, list)):
+        return [_plain(i) for i in v]
+    return v
+
+def _from_plain(v: Any) -> Any:
+    if isinstance(v, dict) and len(v) == 1:
+        k, name = next(iter(v.items()))
+        if k in ENUMS:
+            return ENUMS[k][name]
+    if isinstance(v, list):
+        return [_from_plain(i) for i in v]
+    return v
+
+def encode_block(block: Block) -> Dict[str, Any]:
+    if isinstance(block.to, Block):
+        to = {'block': block.to.name}
+    else:
+        to = _plain(block.to)
+
+    record = {
+        'type': type(block).__name__,
+        'name': block.name,
+        'pictype': block.pictype.name,
+        'dim': block.dim,
+        'default_size': _plain(block._default_size),
+        'scale_factor': _plain(block.scale_factor),
+        'offset': _plain(block.offset),
+        'to': to,
+        'looped': block.looped,
+        'labels': [block.xlabel, block.ylabel, block.zlabel],
+        'args': {k: _plain(v) for k, v in block.args.items()}
+    }
+    if isinstance(block, ImgInputBlock):
+        record['file_path'] = block.file_path
+        record['viewport'] = _plain(block.viewport)
+    return record
+
+def decode_block(record: Dict[str, Any], blocks: Mapping, store: BlockStore = None) -> Block:
+    cls = _subclasses(Block)[record['type']]
+    block = cls.__new__(cls)
+    block._attach(BlockStore(1) if store is None else store)
+
+    block.name = record['name']
+    block.pictype = PICTYPE[record['pictype']]
+    block.offset = np.array(record['offset'])
+    to = record['to']
+    if isinstance(to, dict):
+        block.to = blocks[to['block']]
+    elif isinstance(to, list):
+        block.to = tuple(to)
+    else:
+        block.to = to
+    block.looped = record['looped']
+    block.xlabel, block.ylabel, block.zlabel = record['labels']
+    block.args = {k: _from_plain(v) for k, v in record['args'].items()}
+    block.scale_factor = np.array(record['scale_factor'])
+    block._default_size = record['default_size']
+    block._dim = record['dim']
+    block.dim = record['dim']
+    if 'file_path' in record:
+        block.file_path = record['file_path']
+        block.viewport = record.get('viewport')
+    return block
+
+def encode_connection(connection: Connection) -> Dict[str, Any]:
+    return {'type': type(connection).__name__, 'from': connection.block1.name, 'to': connection.block2.name}
+
+def decode_connection(record: Dict[str, Any], blocks: Mapping) -> Connection:
+    cls = _subclasses(Connection)[record['type']]
+    return cls(blocks[record['from']], blocks[record['to']])
+
+def encode_layout(layout: Layout) -> Dict[str, Any]:
+    """sizes and dims of the scaled blocks and gaps of all blocks, blocks are given by name"""
+    layout.compact()
+    return {
+        'blocks': [b.name for b in layout.blocks],
+        'sizes': _plain(layout.sizes),
+        'dims': _plain(layout.dims),
+        'placed': [b.name for b in layout.placed],
+        'gaps': _plain(layout.gaps)
+    }
+
+def encode(sequence: BlockSequence) -> Dict[str, Any]:
+    """returns the versioned IR of the blocks and connections in sequence. It contains only plain values, blocks reference each other by name"""
+    state = sequence.state()
+    ir = {
+        'format': IR_FORMAT,
+        'version': IR_VERSION,
+        'blocks': [encode_block(b) for b in state['blocks']],
+        'connections': [encode_connection(c) for c in state['connections']]
+    }
+    if sequence.block_factory.layout is not None:
+        ir['layout'] = encode_layout(sequence.block_factory.layout)
+    return ir
+
+class LazyDict(MutableMapping):
+    """dict whose values are decoded from their records on first access"""
+
+    def __init__(self, records: Iterable[tuple], decode: Callable[[Dict[str, Any]], Any]) -> None:
+        self._items: Dict[Any, Any] = dict(records)
+        self._raw = set(self._items.keys())
+        self._decode = decode
+
+    def __getitem__(self, key: Any) -> Any:
+        item = self._items[key]
+        if key in self._raw:
+            item = self._decode(item)
+            self._items[key] = item
+            self._raw.discard(key)
+        return item
+
+    def __setitem__(self, key: Any, value: Any):
+        self._items[key] = value
+        self._raw.discard(key)
+
+    def __delitem__(self, key: Any):
+        del self._items[key]
+        self._raw.discard(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def decoded(self) -> int:
+        return len(self._items) - len(self._raw)
+
+class _ByName(Mapping):
+    """view of blocks by id as blocks by name"""
+
+    def __init__(self, ids: Dict[str, int], blocks: LazyDict) -> None:
+        self._ids = ids
+        self._blocks = blocks
+
+    def __getitem__(self, name: str) -> Block:
+        return self._blocks[self._ids[name]]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+def decode_layout(record: Dict[str, Any], blocks: Mapping) -> Layout:
+    layout = Layout()
+    layout.load(record['blocks'], record['sizes'], record['dims'], record['placed'], record['gaps'], blocks)
+    return layout
+
+def decode(ir: Dict[str, Any], sequence: BlockSequence):
+    """loads ir into sequence, blocks and connections are only created when they are accessed"""
+    if ir.get('format') != IR_FORMAT:
+        raise ValueError('not a pytorch2tikz IR')
+    if ir['version'] > IR_VERSION:
+        raise ValueError(f'IR version {ir["version"]} is newer than the supported version {IR_VERSION}')
+
+    ids = {r['name']: i for i, r in enumerate(ir['blocks'])}
+    blocks = LazyDict(enumerate(ir['blocks']), lambda r: decode_block(r, by_name, sequence.store))
+    by_name = _ByName(ids, blocks)
+    connections = LazyDict((((ids[r['from']], ids[r['to']]), r) for r in ir['connections']), lambda r: decode_connection(r, by_name))
+
+    # IRs of version 1 have no layout, their blocks keep the stored scale factors and offsets
+    layout = decode_layout(ir['layout'], by_name) if 'layout' in ir else None
+    sequence.load(blocks, ids, connections, layout)
+
+def _format(file: Union[str, IO], format: Union[str, None]) -> str:
+    if format is not None:
+        return format
+    if isinstance(file, str) and file.endswith(('.msgpack', '.mpk')):
+        return 'msgpack'
+    return 'json'
+
+def dump(ir: Dict[str, Any], file: Union[str, IO], format: str = None):
+    """writes ir to a path or file object. format is 'json' or 'msgpack' and is guessed from the file extension if not given"""
+    format = _format(file, format)
+    if format == 'json':
+        data = json.dumps(ir, indent=1).encode()
+    elif format == 'msgpack':
+        if msgpack is None:
+            raise ImportError('writing msgpack requires the msgpack package')
+        data = msgpack.packb(ir, use_bin_type=True)
+    else:
+        raise ValueError(f'unknown format {format}')
+
+    if isinstance(file, str):
+        with open(file, 'wb') as f:
+            f.write(data)
+    else:
+        file.write(data)
+
+def load(file: Union[str, IO], format: str = None) -> Dict[str, Any]:
+    format = _format(file, format)
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            data = f.read()
+    else:
+        data = file.read()
+
+    if format == 'json':
+        return json.loads(data)
+    elif format == 'msgpack':
+        if msgpack is None:
+            raise ImportError('reading msgpack requires the msgpack package')
+        return msgpack.unpackb(data, raw=False)
+    raise ValueError(f'unknown format {format}')
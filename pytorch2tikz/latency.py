@@ -0,0 +1,89 @@
+import random
+from time import perf_counter
+from typing import Dict, List, MutableMapping, Sequence, Union
+from weakref import WeakKeyDictionary
+import numpy as np
+from torch import nn
+
+from .constants import COLORMAPS
+from .utils import hex_to_rgb, rgb_to_hex
+
+class LatencyStats:
+    """streaming mean of the latencies of a module and a uniform sample of them (reservoir sampling) for percentiles"""
+    __slots__ = ('count', 'total', 'samples', 'reservoir')
+
+    def __init__(self, reservoir=1024) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.samples: List[float] = []
+        self.reservoir = reservoir
+
+    def add(self, seconds: float, rng: random.Random):
+        self.count += 1
+        self.total += seconds
+        if len(self.samples) < self.reservoir:
+            self.samples.append(seconds)
+        else:
+            i = rng.randrange(self.count)
+            if i < self.reservoir:
+                self.samples[i] = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, q: float) -> float:
+        """q in [0, 100], estimated from the sample"""
+        if len(self.samples) == 0:
+            return 0.0
+        return float(np.percentile(self.samples, q))
+
+    def get(self, statistic: str) -> float:
+        """'mean', 'total' or a percentile like 'p50' or 'p99'"""
+        if statistic == 'mean':
+            return self.mean
+        if statistic == 'total':
+            return self.total
+        if statistic.startswith('p'):
+            return self.percentile(float(statistic[1:]))
+        raise ValueError(f'unknown statistic {statistic}')
+
+class LatencyRecorder:
+    """wall time of module calls from their forward pre hook to their forward hook, aggregated over all passes.
+    Modules are referenced weakly. For CUDA modules this is the time to launch the kernels unless the device is synchronized"""
+
+    def __init__(self, reservoir=1024) -> None:
+        self.reservoir = reservoir
+        self.stats: MutableMapping[nn.Module, LatencyStats] = WeakKeyDictionary()
+        self._start: Dict[int, float] = {}
+        self._rng = random.Random(0)
+
+    def start(self, module: nn.Module, input=None) -> None:
+        """forward pre hook"""
+        self._start[id(module)] = perf_counter()
+
+    def stop(self, module: nn.Module) -> None:
+        """called first in the forward hook"""
+        end = perf_counter()
+        start = self._start.pop(id(module), None)
+        if start is None:
+            return
+        stats = self.stats.get(module)
+        if stats is None:
+            stats = LatencyStats(self.reservoir)
+            self.stats[module] = stats
+        stats.add(end - start, self._rng)
+
+    def clear(self):
+        self.stats.clear()
+        self._start = {}
+
+def colormap(colors: Union[str, Sequence[str]], value: float) -> str:
+    """hex color at value in [0, 1] interpolated linearly between the hex colors (or the colors of a map in COLORMAPS)"""
+    if isinstance(colors, str):
+        colors = COLORMAPS[colors]
+    value = min(max(value, 0.0), 1.0) * (len(colors) - 1)
+    i = min(int(value), len(colors) - 2)
+    t = value - i
+    low, high = hex_to_rgb(colors[i]), hex_to_rgb(colors[i + 1])
+    return rgb_to_hex(tuple(round(a + (b - a) * t) for a, b in zip(low, high)))
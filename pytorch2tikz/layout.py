@@ -0,0 +1,243 @@
+from array import array
+from collections.abc import Mapping, MutableSequence
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+import numpy as np
+
+from .constants import CM_FACTOR, DIM_FACTOR, DEFAULT_VALUE
+
+# default scale of the box pics in block/tex.py, block widths times BOX_SCALE are centimeters
+BOX_SCALE = 0.2
+
+def shape_matrix(output_shapes: Iterable[Tuple[int]], dims: Iterable[int]) -> np.ndarray:
+    """returns the (N, 3) matrix of block sizes. The last dim entries are taken from the output shape, the others are DEFAULT_VALUE"""
+    dims = list(dims)
+    sizes = np.full((len(dims), 3), DEFAULT_VALUE, dtype=np.int64)
+    for i, (shape, dim) in enumerate(zip(output_shapes, dims)):
+        sizes[i, -dim:] = shape[-dim:]
+    return sizes
+
+def incremental(sizes: np.ndarray, dims: np.ndarray, width_factor=0.8, height_depth_factor=0.8, linear_factor=0.8) -> np.ndarray:
+    """scale factors of the blocks which change by the relative size of consecutive blocks.
+    Gives the same results as the former block by block computation of BlockFactory"""
+    n = len(sizes)
+    out = np.zeros((n, 3))
+    if n < 2:
+        return out
+
+    # step t is the change from block t to block t + 1, the leading flat dimensions are not compared
+    masked = sizes[1:].copy()
+    masked[np.arange(3)[None, :] < 3 - dims[1:, None]] = 0
+    ratio = masked / sizes[:-1]
+    ratio[ratio == 1] = 0
+    steps = ratio * np.array([-width_factor / 2 / 2, height_depth_factor, height_depth_factor])
+    # if scaling is too large use linear_factor for reduction
+    large = ~np.all(steps < 4, axis=1)
+
+    first = np.clip(steps[0], -1, 1)
+    if large[0]:
+        first[1:] = -linear_factor
+
+    # height and depth accumulate the steps and are reset by large steps. Each segment is summed up in order, so rounding is the same as before
+    resets = np.flatnonzero(large[1:]) + 1
+    starts = np.concatenate(([0], resets))
+    ends = np.concatenate((resets, [n - 1]))
+    for start, end in zip(starts, ends):
+        base = first[1:] if start == 0 else np.full(2, -linear_factor)
+        out[start + 1:end + 1, 1:] = np.cumsum(np.concatenate((base[None], steps[start + 1:end, 1:])), axis=0)
+
+    # width shrinks relatively to its current value, or starts from the step if it is zero. This recurrence is not associative,
+    # so it is evaluated on plain floats, only for the steps which change the width
+    width = out[1:, 0]
+    value = first[0]
+    last = 0
+    for t in np.flatnonzero(steps[1:, 0] != 0) + 1:
+        width[last:t] = value
+        step = steps[t, 0]
+        value = value - value * step * 2 if value != 0 else step
+        last = t
+    width[last:] = value
+
+    return out
+
+def uniform(sizes: np.ndarray, dims: np.ndarray, **kwargs) -> np.ndarray:
+    """no scaling, all blocks are drawn with their actual sizes"""
+    return np.zeros((len(sizes), 3))
+
+STRATEGIES: Dict[str, Callable[..., np.ndarray]] = {
+    'incremental': incremental,
+    'uniform': uniform
+}
+
+def fit_width(widths: np.ndarray, scale_factors: np.ndarray, offsets: np.ndarray, target_width: float) -> float:
+    """rescales the widths of the blocks and the gaps in x direction in place, so the drawn blocks span target_width centimeters.
+    widths are the unscaled block widths, returns the applied factor"""
+    drawn = np.maximum(widths / DIM_FACTOR * (1 + scale_factors[:, 0]), DEFAULT_VALUE)
+    total = (drawn.sum() + offsets[:, 0].sum()) * BOX_SCALE
+    if total == 0:
+        return 1.0
+
+    factor = target_width / total
+    scale_factors[:, 0] = factor * (1 + scale_factors[:, 0]) - 1
+    offsets[:, 0] *= factor
+    return factor
+
+def positions(widths: np.ndarray, scale_factors: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """absolute x positions of the east sides of a chain of blocks in centimeters"""
+    drawn = np.maximum(widths / DIM_FACTOR * (1 + scale_factors[:, 0]), DEFAULT_VALUE)
+    return np.cumsum(drawn * BOX_SCALE + offsets[:, 0] / CM_FACTOR)
+
+class BlockList(MutableSequence):
+    """list of blocks given by name which are looked up in a mapping on access, e.g. of lazily decoded blocks. Blocks appended later are stored as they are"""
+
+    def __init__(self, names: Iterable[str], blocks: Mapping) -> None:
+        self._items: List = list(names)
+        self._blocks = blocks
+
+    def __getitem__(self, i: int):
+        item = self._items[i]
+        return self._blocks[item] if isinstance(item, str) else item
+
+    def __setitem__(self, i: int, block):
+        self._items[i] = block
+
+    def __delitem__(self, i: int):
+        del self._items[i]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def insert(self, i: int, block):
+        self._items.insert(i, block)
+
+    def select(self, rows: Iterable[int]) -> 'BlockList':
+        """the blocks at rows, blocks which are not decoded yet stay undecoded"""
+        return BlockList([self._items[i] for i in rows], self._blocks)
+
+class Layout:
+    """layout of all blocks created by a BlockFactory. Block sizes and gaps are collected during the capture in flat typed arrays
+    and the scale factors and offsets of all blocks are computed at once by compute().
+    Removed blocks are only marked and dropped from the arrays by the next compute()"""
+
+    def __init__(self) -> None:
+        # blocks which are scaled, in order of creation, with their sizes and dims
+        self.blocks: List = []
+        self._sizes = array('q')
+        self._dims = array('q')
+        # all blocks (including inputs) with their offsets in multiples of the block offset
+        self.placed: List = []
+        self._gaps = array('d')
+        # rows of the blocks in blocks and placed by name and the rows of removed blocks
+        self._rows: Dict[str, int] = {}
+        self._placed_rows: Dict[str, int] = {}
+        self._removed: Set[int] = set()
+        self._removed_placed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.placed) - len(self._removed_placed)
+
+    def add(self, block, output_shape: Tuple[int], dim: int, gaps: Tuple[float, float, float]):
+        self._rows[block.name] = len(self.blocks)
+        self.blocks.append(block)
+        self._sizes.extend((DEFAULT_VALUE,) * (3 - dim))
+        self._sizes.extend(output_shape[-dim:])
+        self._dims.append(dim)
+        self.place(block, gaps)
+
+    def place(self, block, gaps: Tuple[float, float, float]):
+        self._placed_rows[block.name] = len(self.placed)
+        self.placed.append(block)
+        self._gaps.extend(gaps)
+
+    def remove(self, block):
+        """removes block with its size and gap, e.g. when it is removed from the figure"""
+        row = self._rows.pop(block.name, None)
+        if row is not None:
+            self._removed.add(row)
+        row = self._placed_rows.pop(block.name, None)
+        if row is not None:
+            self._removed_placed.add(row)
+
+    def compact(self):
+        """drops the rows of removed blocks"""
+        if len(self._removed) > 0:
+            self.blocks, self._rows = _compact(self.blocks, self._rows, self._removed)
+            self._sizes = _compact_array(self._sizes, self._removed, 3)
+            self._dims = _compact_array(self._dims, self._removed, 1)
+            self._removed = set()
+        if len(self._removed_placed) > 0:
+            self.placed, self._placed_rows = _compact(self.placed, self._placed_rows, self._removed_placed)
+            self._gaps = _compact_array(self._gaps, self._removed_placed, 3)
+            self._removed_placed = set()
+
+    def load(self, names: List[str], sizes: Iterable[Iterable[int]], dims: Iterable[int], placed: List[str], gaps: Iterable[Iterable[float]], blocks: Mapping):
+        """replaces the blocks with their sizes and gaps, e.g. by the ones stored in an IR. The blocks and placed blocks are given by name
+        and looked up in blocks when they are accessed"""
+        self.blocks = BlockList(names, blocks)
+        self._sizes = array('q', (v for size in sizes for v in size))
+        self._dims = array('q', dims)
+        self.placed = BlockList(placed, blocks)
+        self._gaps = array('d', (v for gap in gaps for v in gap))
+        self._rows = {name: i for i, name in enumerate(names)}
+        self._placed_rows = {name: i for i, name in enumerate(placed)}
+        self._removed = set()
+        self._removed_placed = set()
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """(N, 3) matrix of the block sizes"""
+        return np.frombuffer(self._sizes, dtype=np.int64).reshape(-1, 3)
+
+    @property
+    def dims(self) -> np.ndarray:
+        return np.frombuffer(self._dims, dtype=np.int64)
+
+    @property
+    def gaps(self) -> np.ndarray:
+        return np.frombuffer(self._gaps, dtype=float).reshape(-1, 3)
+
+    def compute(self,
+                block_offset=8,
+                width_factor=0.8,
+                height_depth_factor=0.8,
+                linear_factor=0.8,
+                strategy='incremental',
+                target_width: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """returns the (N, 3) scale factors of self.blocks and the (M, 3) offsets of self.placed.
+        strategy is a key of STRATEGIES or a function with the signature of incremental. If target_width is given the blocks are scaled to span target_width centimeters"""
+        if isinstance(strategy, str):
+            if strategy not in STRATEGIES:
+                raise ValueError(f'unknown layout strategy {strategy}')
+            strategy = STRATEGIES[strategy]
+        self.compact()
+
+        scale_factors = strategy(self.sizes, self.dims, width_factor=width_factor, height_depth_factor=height_depth_factor, linear_factor=linear_factor)
+        offsets = self.gaps * block_offset
+
+        if target_width is not None and len(self.blocks) > 0:
+            index = {id(b): i for i, b in enumerate(self.placed)}
+            chain = np.array([index[id(b)] for b in self.blocks])
+            chain_offsets = offsets[chain]
+            widths = np.array([b.args['width'] for b in self.blocks], dtype=float)
+            fit_width(widths, scale_factors, chain_offsets, target_width)
+            offsets[chain] = chain_offsets
+
+        return scale_factors, offsets
+
+    def apply(self, **kwargs):
+        """computes the layout and sets the scale factors and offsets of the blocks. For the keyword arguments see compute"""
+        scale_factors, offsets = self.compute(**kwargs)
+        for block, scale_factor in zip(self.blocks, scale_factors):
+            block.scale_factor = scale_factor
+        for block, offset in zip(self.placed, offsets):
+            block.offset = offset
+
+def _compact(blocks: List, rows: Dict[str, int], removed: Set[int]) -> Tuple[List, Dict[str, int]]:
+    keep = [i for i in range(len(blocks)) if i not in removed]
+    new_rows = np.zeros(len(blocks), dtype=np.int64)
+    new_rows[keep] = np.arange(len(keep))
+    kept = blocks.select(keep) if isinstance(blocks, BlockList) else [blocks[i] for i in keep]
+    return kept, {name: int(new_rows[i]) for name, i in rows.items()}
+
+def _compact_array(values: array, removed: Set[int], width: int) -> array:
+    rows = np.frombuffer(values, dtype=values.typecode).reshape(-1, width)
+    return array(values.typecode, np.delete(rows, sorted(removed), axis=0).tobytes())
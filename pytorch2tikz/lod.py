@@ -0,0 +1,65 @@
+from typing import Dict, List, Tuple, Union
+from torch import nn
+
+from .module_graph import ModuleGraph
+
+class ModuleGroup:
+    """a module which is drawn as a single ModuleBlock together with all its submodules"""
+    __slots__ = ('module', 'caption', '__weakref__')
+
+    def __init__(self, module: nn.Module) -> None:
+        self.module = module
+        self.caption = type(module).__name__
+
+    def __repr__(self) -> str:
+        return f'ModuleGroup: {str(type(self.module))}'
+
+def group_modules(graph: ModuleGraph, max_depth: int) -> Dict[nn.Module, ModuleGroup]:
+    """maps every module below a node at max_depth (the root has depth 0) to a group of this node. Nodes without children are not grouped"""
+    groups = {}
+    for node in graph.at_depth(max_depth):
+        if len(node.children) == 0:
+            continue
+        group = ModuleGroup(node.module)
+        for n in node.bfs():
+            groups[n.module] = group
+    return groups
+
+class CallGrouper:
+    """merges consecutive calls of modules in the same group into one call of the group with the input of the first and the output shape of the last call.
+    Sources are replaced by their group, sources inside the group are dropped"""
+
+    def __init__(self, groups: Dict[nn.Module, ModuleGroup]) -> None:
+        self.groups = groups
+        self._current: Union[list, None] = None
+
+    def push(self, module: nn.Module, input, out_shape: Tuple[int], sources: List[Union[nn.Module, None]]) -> List[tuple]:
+        """returns the calls which are complete after the call of module"""
+        done = []
+        group = self.groups.get(module)
+        if self._current is not None and group is not self._current[0]:
+            done.extend(self.flush())
+
+        sources = [self.groups.get(s, s) for s in sources]
+        if group is None:
+            done.append((module, input, out_shape, sources))
+        elif self._current is None:
+            self._current = [group, input, out_shape, []]
+            self._add_sources(sources)
+        else:
+            self._current[2] = out_shape
+            self._add_sources(sources)
+        return done
+
+    def _add_sources(self, sources: List[Union[nn.Module, None]]):
+        group, current = self._current[0], self._current[3]
+        for s in sources:
+            if s is not group and not any(s is c for c in current):
+                current.append(s)
+
+    def flush(self) -> List[tuple]:
+        """returns the pending call of a group, called at the end of a forward pass"""
+        if self._current is None:
+            return []
+        current, self._current = self._current, None
+        return [tuple(current)]
@@ -1,5 +1,8 @@
+from torch import nn
+
 from .block.D1 import LinearBlock, LSTMBlock, EmbeddingBlock
-from .block.Dn import ConvBlock, NormBlock, PoolBlock, ActivationBlock, DropoutBlock
+from .block.Dn import ConvBlock, NormBlock, PoolBlock, ActivationBlock, DropoutBlock, ModuleBlock
+from .lod import ModuleGroup
 
 BLOCK_MAPPING = {
     'torch.nn.modules.conv': ConvBlock,
@@ -10,4 +13,22 @@ BLOCK_MAPPING = {
     'torch.nn.modules.sparse.Embedding': EmbeddingBlock,
     'torch.nn.modules.dropout': DropoutBlock,
     'torch.nn.modules.activation': ActivationBlock
+}
+
+# classes of pytorch2tikz which are drawn as blocks, matched by type
+TYPE_MAPPING = {
+    ModuleGroup: ModuleBlock
+}
+
+# functional ops recognized by the fx backend and the module they are drawn as
+FUNCTION_MAPPING = {
+    'relu': nn.ReLU,
+    'relu6': nn.ReLU6,
+    'leaky_relu': nn.LeakyReLU,
+    'elu': nn.ELU,
+    'gelu': nn.GELU,
+    'silu': nn.SiLU,
+    'sigmoid': nn.Sigmoid,
+    'tanh': nn.Tanh,
+    'softmax': nn.Softmax
 }
\ No newline at end of file
@@ -0,0 +1,96 @@
+from itertools import accumulate
+from typing import Dict, Iterable, List, MutableMapping, Tuple, Union
+from weakref import ReferenceType, WeakKeyDictionary, ref
+from torch import Tensor, nn
+
+MODES = ('cumulative', 'live')
+
+def tensor_bytes(tensors: Iterable[Tensor]) -> int:
+    """bytes of the data of the tensors, computed from their shape and dtype only"""
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+def parameter_bytes(module: nn.Module) -> int:
+    return tensor_bytes(module.parameters())
+
+# modules whose output is a view of their input
+VIEW_MODULES = (nn.Flatten, nn.Unflatten, nn.Identity)
+
+def _storage_key(t: Tensor) -> int:
+    if not t.is_meta:
+        ptr = t.untyped_storage().data_ptr()
+        if ptr != 0:
+            return ptr
+    # tensors without storage (e.g. on the meta device) are identified by the tensor they view
+    return id(t._base if t._base is not None else t)
+
+def output_bytes(outputs: Iterable[Tensor], inputs: Iterable[Tensor]) -> int:
+    """bytes of the outputs which are new allocations. Outputs sharing storage with an input or an earlier output,
+    e.g. of in-place ops and views, are not counted"""
+    seen = set(_storage_key(t) for t in inputs)
+    nbytes = 0
+    for t in outputs:
+        key = _storage_key(t)
+        if key not in seen:
+            seen.add(key)
+            nbytes += t.numel() * t.element_size()
+    return nbytes
+
+def aliases_input(module: nn.Module) -> bool:
+    """whether the output of module shares storage with its input, for calls which are only known by their shapes"""
+    return getattr(module, 'inplace', False) is True or isinstance(module, VIEW_MODULES)
+
+class MemoryRecorder:
+    """activation bytes of module calls, aggregated while capturing. Each module keeps its largest output and the bytes of its parameters,
+    the calls of the first pass are kept in order with the calls producing their inputs to compute the memory over the forward pass.
+    Modules are referenced weakly"""
+
+    def __init__(self) -> None:
+        self.activations: MutableMapping[nn.Module, int] = WeakKeyDictionary()
+        self.parameters: MutableMapping[nn.Module, int] = WeakKeyDictionary()
+        # (module, output bytes, indices of the calls producing the inputs)
+        self.calls: List[Tuple[ReferenceType, int, Tuple[int, ...]]] = []
+        self.cumulative = 0
+        self._index: Dict[int, int] = {}
+        self._recording = True
+
+    def add(self, module: nn.Module, nbytes: int, sources: List[Union[nn.Module, None]]):
+        if nbytes > self.activations.get(module, -1):
+            self.activations[module] = nbytes
+        if module not in self.parameters:
+            self.parameters[module] = parameter_bytes(module)
+
+        if not self._recording:
+            return
+        srcs = tuple(self._index[id(s)] for s in sources if s is not None and id(s) in self._index)
+        self._index[id(module)] = len(self.calls)
+        self.calls.append((ref(module), nbytes, srcs))
+        self.cumulative += nbytes
+
+    def end_pass(self):
+        if len(self.calls) > 0:
+            self._recording = False
+            self._index = {}
+
+def timeline(calls: List[Tuple[object, int, Tuple[int, ...]]], mode='cumulative') -> List[int]:
+    """activation bytes after each call. 'cumulative' keeps every output (as for the backward pass when training),
+    'live' frees an output after the last call reading it (as in inference)"""
+    sizes = [c[1] for c in calls]
+    if mode == 'cumulative':
+        return list(accumulate(sizes))
+    if mode != 'live':
+        raise ValueError(f'unknown mode {mode}, expected one of {MODES}')
+
+    last_use = list(range(len(calls)))
+    for i, (_, _, srcs) in enumerate(calls):
+        for j in srcs:
+            last_use[j] = max(last_use[j], i)
+
+    freed = [0] * (len(calls) + 1)
+    for j, end in enumerate(last_use):
+        freed[end + 1] += sizes[j]
+
+    out, live = [], 0
+    for i, size in enumerate(sizes):
+        live += size - freed[i]
+        out.append(live)
+    return out
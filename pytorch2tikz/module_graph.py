@@ -1,39 +1,147 @@
-from typing import List, Union
+from collections import deque
+from typing import Dict, Generator, List, Union
+import weakref
 from torch import nn
 
 class ModuleNode:
+    __slots__ = ('_module', 'parent', 'children', 'name', 'depth')
 
-    def __init__(self, module: nn.Module, parent=None) -> None:
-        self.parent = parent
+    def __init__(self, module: nn.Module, parent=None, name='', depth=0) -> None:
+        self.parent: Union[ModuleNode, None] = parent
         self.children: List[ModuleNode] = []
-        self.module = module
-    
-    def bfs(self):
-        queue = [self]
+        # the graph is cached per module, so modules are only referenced weakly
+        self._module = weakref.ref(module)
+        # qualified name as given by named_modules
+        self.name = name
+        self.depth = depth
+
+    @property
+    def module(self) -> Union[nn.Module, None]:
+        return self._module()
+
+    def bfs(self) -> Generator['ModuleNode', None, None]:
+        queue = deque([self])
         while len(queue) > 0:
-            queue.extend(queue[0].children)
-            yield queue.pop(0)
-    
+            node = queue.popleft()
+            queue.extend(node.children)
+            yield node
+
+    def dfs(self) -> Generator['ModuleNode', None, None]:
+        """nodes in preorder"""
+        stack = [self]
+        while len(stack) > 0:
+            node = stack.pop()
+            stack.extend(reversed(node.children))
+            yield node
+
     def __repr__(self) -> str:
         return f'Module: {str(type(self.module))}'
 
-def create_module_graph(model: nn.Module) -> Union[ModuleNode, None]:
+def _skipped(module: nn.Module) -> bool:
+    t = str(type(module))
+    return ('loss' in t) or ('vocab' in t)
+
+def _fingerprint(model: nn.Module) -> tuple:
+    """ids of all submodules in the order of named_modules, each followed by the names of its children"""
+    out, memo = [], set()
+    stack = [model]
+    while len(stack) > 0:
+        module = stack.pop()
+        if id(module) in memo:
+            continue
+        memo.add(id(module))
+        out.append(id(module))
+        out.append(tuple(module._modules))
+        stack.extend(c for c in reversed(module._modules.values()) if c is not None)
+    return tuple(out)
+
+class ModuleGraph:
+    """tree of the submodules of a model with indexes by module, qualified name and depth.
+    Losses and vocabularies are skipped, children of an nn.Sequential are children of its parent. Modules used at several places get a single node.
+    The tree is built iteratively, so it is not limited by the recursion depth"""
+
+    def __init__(self, model: nn.Module) -> None:
+        self.root: Union[ModuleNode, None] = None
+        self.nodes: List[ModuleNode] = []
+        self.levels: List[List[ModuleNode]] = []
+        self._by_id: Dict[int, ModuleNode] = {}
+        self._by_name: Dict[str, ModuleNode] = {}
+
+        fingerprint, memo = [], set()
+        # (qualified name, module, node adopting its children, whether the parent is drawn as a node)
+        stack = [('', model, None, False)]
+        while len(stack) > 0:
+            name, module, owner, parent_is_node = stack.pop()
+            if id(module) in memo:
+                continue
+            memo.add(id(module))
+            fingerprint.append(id(module))
+            fingerprint.append(tuple(module._modules))
+
+            node = None
+            if owner is None and name != '':
+                # below a skipped module
+                pass
+            elif _skipped(module):
+                pass
+            elif parent_is_node and type(module) is nn.Sequential:
+                node = owner
+            else:
+                depth = 0 if owner is None else owner.depth + 1
+                node = self._add(ModuleNode(module, owner, name, depth))
+
+            is_node = node is not None and node.module is module
+            stack.extend((f'{name}.{n}' if name else n, c, node, is_node) for n, c in reversed(module._modules.items()) if c is not None)
 
-    t = str(type(model))
-    if ('loss' in t)\
-        or ('vocab' in t):
-        return None
-
-    root = ModuleNode(model)
-    for child in model.children():
-        if 'torch.nn.modules.container.Sequential' in str(type(child)):
-            for child_seq in child.children():
-                child_mod = create_module_graph(child_seq)
-                if child_mod is not None:
-                    root.children.append(child_mod)
+        self.fingerprint = tuple(fingerprint)
+
+    def _add(self, node: ModuleNode) -> ModuleNode:
+        if node.parent is None:
+            self.root = node
         else:
-            child_mod = create_module_graph(child)
-            if child_mod is not None:
-                root.children.append(child_mod)
+            node.parent.children.append(node)
+        if node.depth == len(self.levels):
+            self.levels.append([])
+        self.levels[node.depth].append(node)
+        self.nodes.append(node)
+        self._by_id[id(node.module)] = node
+        self._by_name[node.name] = node
+        return node
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self):
+        """nodes in breadth first order"""
+        for level in self.levels:
+            yield from level
+
+    def node(self, module: nn.Module) -> Union[ModuleNode, None]:
+        node = self._by_id.get(id(module))
+        if node is None or node.module is not module:
+            return None
+        return node
+
+    def find(self, name: str) -> Union[ModuleNode, None]:
+        """node by its qualified name, e.g. 'layer1.0.conv1'"""
+        return self._by_name.get(name)
 
-    return root
\ No newline at end of file
+    def at_depth(self, depth: int) -> List[ModuleNode]:
+        return self.levels[depth] if depth < len(self.levels) else []
+
+_graphs: 'weakref.WeakKeyDictionary[nn.Module, ModuleGraph]' = weakref.WeakKeyDictionary()
+
+def module_graph(model: nn.Module) -> ModuleGraph:
+    """the ModuleGraph of model. Graphs are cached per model and built again when a submodule was added, removed or replaced.
+    Checking the cached graph walks all submodules, so each call costs O(N), about half of building the graph. A constant time check is not possible,
+    as PyTorch has no hooks for removed submodules. Callers should therefore request the graph once per operation instead of once per module"""
+    graph = _graphs.get(model)
+    if graph is not None and graph.fingerprint == _fingerprint(model):
+        return graph
+
+    graph = ModuleGraph(model)
+    _graphs[model] = graph
+    return graph
+
+def create_module_graph(model: nn.Module) -> Union[ModuleNode, None]:
+    return module_graph(model).root
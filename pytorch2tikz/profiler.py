@@ -0,0 +1,131 @@
+import gzip
+import json
+import re
+from typing import IO, Any, Dict, Generator, Iterable, MutableMapping, Tuple, Union
+from weakref import WeakKeyDictionary, WeakValueDictionary
+from torch import nn
+
+# name of the events torch.profiler(with_stack=True) records for module calls, e.g. 'nn.Module: Conv2d_0'
+MODULE_PREFIX = 'nn.Module: '
+UNITS = {'s': 1.0, 'ms': 1e-3, 'us': 1e-6, 'ns': 1e-9}
+_TRACE_EVENTS = re.compile(r'"traceEvents"\s*:\s*\[')
+
+class ScopeNames:
+    """names of modules in profiler traces. torch.profiler numbers the instances of each module class in the order of their first call,
+    so the names follow from the order in which the modules are captured. Modules are referenced weakly"""
+
+    def __init__(self) -> None:
+        self._counts: Dict[type, int] = {}
+        self._names: MutableMapping[nn.Module, str] = WeakKeyDictionary()
+        self.modules: MutableMapping[str, nn.Module] = WeakValueDictionary()
+
+    def add(self, module: nn.Module):
+        if module in self._names:
+            return
+        cls = type(module)
+        i = self._counts.get(cls, 0)
+        self._counts[cls] = i + 1
+        name = f'{cls.__name__}_{i}'
+        self._names[module] = name
+        self.modules[name] = module
+
+def iter_trace_events(file: Union[str, IO], chunk_size=1 << 20) -> Generator[Dict[str, Any], None, None]:
+    """yields the events of a Chrome trace (an object with a traceEvents array or a bare array) one by one.
+    The file is read in chunks, so only a chunk and the current event are held in memory. Paths ending with .gz are decompressed"""
+    if isinstance(file, str):
+        f = gzip.open(file, 'rt', encoding='utf-8') if file.endswith('.gz') else open(file, encoding='utf-8')
+        with f:
+            yield from iter_trace_events(f, chunk_size)
+        return
+
+    decoder = json.JSONDecoder()
+    buf, pos = '', 0
+
+    def fill() -> bool:
+        nonlocal buf, pos
+        chunk = file.read(chunk_size)
+        buf, pos = buf[pos:] + chunk, 0
+        return len(chunk) > 0
+
+    # find the start of the event array, the keys before it are small
+    while True:
+        stripped = buf.lstrip()
+        if stripped.startswith('['):
+            pos = len(buf) - len(stripped) + 1
+            break
+        match = _TRACE_EVENTS.search(buf)
+        if match is not None:
+            pos = match.end()
+            break
+        if not fill():
+            return
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buf):
+            if not fill():
+                return
+            continue
+        if buf[pos] == ']':
+            return
+
+        try:
+            event, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # the event continues in the next chunk
+            if not fill():
+                raise
+            continue
+        pos = end
+        yield event
+
+def trace_times(events: Iterable[Dict[str, Any]]) -> Dict[str, Tuple[float, int]]:
+    """total seconds and number of the complete ('X') events by name. Durations of Chrome traces are given in microseconds"""
+    out = {}
+    for e in events:
+        if e.get('ph') != 'X' or 'dur' not in e:
+            continue
+        total, count = out.get(e['name'], (0.0, 0))
+        out[e['name']] = (total + e['dur'] * 1e-6, count + 1)
+    return out
+
+def _seconds(value: str) -> float:
+    match = re.fullmatch(r'([0-9.]+)\s*([a-z]+)', value.strip())
+    if match is None:
+        raise ValueError(f'could not parse time {value}')
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+def table_times(table: str, column='CPU total') -> Dict[str, Tuple[float, int]]:
+    """total seconds (of column) and number of calls by name from a table printed by key_averages().table().
+    The table contains no module events, only record_function scopes can be mapped to modules"""
+    out = {}
+    header = None
+    for line in table.splitlines():
+        cells = re.split(r'\s{2,}', line.strip())
+        if header is None:
+            if 'Name' in cells and column in cells:
+                header = cells
+            continue
+        if len(cells) != len(header) or set(line.strip()) <= {'-', ' '}:
+            continue
+        row = dict(zip(header, cells))
+        out[row['Name']] = (_seconds(row[column]), int(row.get('# of Calls', 1)))
+    return out
+
+def averages_times(averages: Iterable[Any]) -> Dict[str, Tuple[float, int]]:
+    """total seconds and number of calls by key from the result of key_averages(). Times of the profiler are given in microseconds.
+    key_averages() contains no module events, only record_function scopes can be mapped to modules"""
+    return {e.key: (e.cpu_time_total * 1e-6, e.count) for e in averages}
+
+def profile_times(source: Union[str, IO, Iterable[Any]]) -> Dict[str, Tuple[float, int]]:
+    """total seconds and number of calls by scope name from a Chrome trace (path or stream), a key_averages() result or its printed table"""
+    if isinstance(source, str) and '\n' in source:
+        return table_times(source)
+    if isinstance(source, str) or hasattr(source, 'read'):
+        return trace_times(iter_trace_events(source))
+    return averages_times(source)
+
+def scope_key(name: str) -> str:
+    """the module name of a profiler event, e.g. 'Conv2d_0' for 'nn.Module: Conv2d_0'"""
+    return name[len(MODULE_PREFIX):] if name.startswith(MODULE_PREFIX) else name
@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from functools import partial
+from typing import Any, List
+import weakref
+from torch import Tensor
+
+UNKNOWN = object()
+
+def flatten_tensors(x: Any) -> List[Tensor]:
+    """returns all tensors of (nested) tuples and lists, e.g. (output, (h, c)) of LSTMs"""
+    if isinstance(x, Tensor):
+        return [x]
+    if isinstance(x, (tuple, list)):
+        out = []
+        for i in x:
+            out.extend(flatten_tensors(i))
+        return out
+    return []
+
+class ProvenanceMap:
+    """maps live tensors to the module which produced them. Tensors are identified by their storage and held by weak references,
+    so entries vanish when a tensor is freed. At most max_size tensors are tracked, the oldest ones are dropped first."""
+
+    def __init__(self, max_size=4096) -> None:
+        self.max_size = max_size
+        self._producers: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._producers)
+
+    @staticmethod
+    def _key(t: Tensor) -> int:
+        # tensors without storage (e.g. on the meta device) are identified by the object itself
+        ptr = t.data_ptr()
+        return ptr if ptr != 0 else -id(t)
+
+    def _discard(self, key: int, ref: weakref.ref):
+        entry = self._producers.get(key)
+        if entry is not None and entry[0] is ref:
+            del self._producers[key]
+
+    def add(self, t: Tensor, producer: Any):
+        key = self._key(t)
+        self._producers[key] = (weakref.ref(t, partial(self._discard, key)), producer)
+        self._producers.move_to_end(key)
+
+        if len(self._producers) > self.max_size:
+            self._producers.popitem(last=False)
+
+    def get(self, t: Tensor) -> Any:
+        """returns the producer of t or UNKNOWN"""
+        entry = self._producers.get(self._key(t))
+        if entry is None or entry[0]() is None:
+            return UNKNOWN
+        return entry[1]
+
+    def sources(self, tensors: List[Tensor]) -> List[Any]:
+        """returns the known producers of tensors without duplicates"""
+        out = []
+        for t in tensors:
+            p = self.get(t)
+            if p is not UNKNOWN and not any(p is o for o in out):
+                out.append(p)
+        return out
+
+    def clear(self):
+        self._producers.clear()
@@ -0,0 +1,76 @@
+from array import array
+from typing import Dict, Generator, List, Tuple, Union
+from torch import nn, Tensor
+
+END_OF_PASS = -1
+ROOT_INPUT = -1
+
+class EventLog:
+    """compact log of module calls. Each call is stored as a flat record of integers in a preallocated array:
+    module index, number of sources, *source indices, input ndim, *input shape, output ndim, *output shape.
+    Sources are the modules which produced the inputs of the call, ROOT_INPUT stands for an input of the root module.
+    Only inputs of modules which are seen for the first time and which are fed by the root input are kept."""
+
+    def __init__(self, capacity=4096) -> None:
+        self.modules: List[nn.Module] = []
+        self.samples: Dict[int, Tensor] = {}
+
+        self._module_index: Dict[int, int] = {}
+        self._data = array('q', bytes(8 * capacity))
+        self._size = 0
+        self._records = array('q')
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def nbytes(self) -> int:
+        return self._size * self._data.itemsize + len(self._records) * self._records.itemsize
+
+    def _write(self, record: Tuple[int]):
+        start = self._size
+        end = start + len(record)
+        if end > len(self._data):
+            self._data.extend(array('q', bytes(8 * max(end, len(self._data)))))
+
+        self._data[start:end] = array('q', record)
+        self._records.append(start)
+        self._size = end
+
+    def record(self, module: nn.Module, input: Tensor, output: Tensor, sources: List[Union[nn.Module, None]]):
+        index = self._module_index.get(id(module))
+        source_indices = tuple(ROOT_INPUT if s is None else self._module_index[id(s)] for s in sources)
+
+        if index is None:
+            index = len(self.modules)
+            self._module_index[id(module)] = index
+            self.modules.append(module)
+
+            if ROOT_INPUT in source_indices:
+                self.samples[len(self._records)] = input[:1].detach().clone()
+
+        self._write((index, len(source_indices), *source_indices, input.ndim, *input.shape, output.ndim, *output.shape))
+
+    def end_pass(self):
+        self._write((END_OF_PASS,))
+
+    def __iter__(self) -> Generator[Tuple[Union[nn.Module, None], Tuple[int], Tuple[int], List[Union[nn.Module, None]], Union[Tensor, None]], None, None]:
+        """yields (module, input shape, output shape, sources, input sample) for each call.
+        The end of a forward pass is marked with module None"""
+        data = self._data
+        modules = self.modules
+        for i, pos in enumerate(self._records):
+            index = data[pos]
+            if index == END_OF_PASS:
+                yield None, (), (), [], None
+                continue
+
+            pos += 1
+            n_sources = data[pos]
+            sources = [None if s == ROOT_INPUT else modules[s] for s in data[pos + 1:pos + 1 + n_sources]]
+            pos += 1 + n_sources
+            in_shape = tuple(data[pos + 1:pos + 1 + data[pos]])
+            pos += 1 + data[pos]
+            out_shape = tuple(data[pos + 1:pos + 1 + data[pos]])
+
+            yield modules[index], in_shape, out_shape, sources, self.samples.get(i)
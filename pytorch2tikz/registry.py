@@ -0,0 +1,93 @@
+from typing import Dict, List, NamedTuple, Union
+from torch import nn
+
+from .mapping import BLOCK_MAPPING, TYPE_MAPPING
+from .stats import DISABLED, Stats
+
+class LayerInfo(NamedTuple):
+    block: Union[type, None]
+    dim: Union[int, None]
+    hooked: bool
+    ignored: bool
+    conv: bool
+    linear: bool
+    activation: bool
+    pooling: bool
+
+    @property
+    def fuseable(self) -> bool:
+        return self.conv or self.linear
+
+class LayerRegistry:
+    """classifies modules by their class. Each class is resolved only once, afterwards the classification is a dict lookup"""
+
+    def __init__(self, ignore_layers: List[str]=['batchnorm', 'flatten']) -> None:
+        self.custom: Dict[type, LayerInfo] = {}
+        self._infos: Dict[type, LayerInfo] = {}
+        self.ignore_layers = ignore_layers
+        # only resolving a class is timed, the cached lookups are cheaper than timing them
+        self.stats: Stats = DISABLED
+
+    @property
+    def ignore_layers(self) -> List[str]:
+        return self._ignore_layers
+
+    @ignore_layers.setter
+    def ignore_layers(self, ignore_layers: List[str]):
+        self._ignore_layers = ignore_layers
+        self._infos = {}
+
+    def classify(self, module: nn.Module) -> LayerInfo:
+        cls = type(module)
+        info = self._infos.get(cls)
+        if info is None:
+            with self.stats.timed('classify'):
+                info = self._resolve(cls)
+            self._infos[cls] = info
+        return info
+
+    def register(self,
+                 cls: type,
+                 block: type = None,
+                 dim: int = None,
+                 ignored = False,
+                 conv = False,
+                 linear = False,
+                 activation = False,
+                 pooling = False) -> LayerInfo:
+        """registers a custom layer class. Registered classes are always hooked and used as leaf modules when tracing"""
+        if block is None and not ignored:
+            raise ValueError(f'{cls} needs a block type if it is not ignored')
+
+        info = LayerInfo(block, dim, True, ignored, conv, linear, activation, pooling)
+        self.custom[cls] = info
+        self._infos[cls] = info
+        return info
+
+    def _resolve(self, cls: type) -> LayerInfo:
+        if cls in self.custom:
+            return self.custom[cls]
+        if cls in TYPE_MAPPING:
+            return LayerInfo(TYPE_MAPPING[cls], None, False, False, False, False, False, False)
+
+        t = str(cls)
+        name = cls.__name__
+
+        dim = None
+        if name.lower().endswith('d') and name[-2].isdigit():
+            dim = int(name[-2]) + 1
+
+        block = None
+        for key, value in BLOCK_MAPPING.items():
+            if key in t:
+                block = value
+                break
+
+        return LayerInfo(block=block,
+                         dim=dim,
+                         hooked='torch.nn.modules' in t,
+                         ignored=any(l in t for l in self.ignore_layers),
+                         conv='conv' in t,
+                         linear='linear' in t,
+                         activation='activation' in t,
+                         pooling='pooling' in t)
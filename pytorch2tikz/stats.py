@@ -0,0 +1,80 @@
+from collections import defaultdict
+from contextlib import nullcontext
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+class _Timer:
+    __slots__ = ('stats', 'phase', 'start')
+
+    def __init__(self, stats: 'Stats', phase: str) -> None:
+        self.stats = stats
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(self.phase, perf_counter() - self.start)
+        return False
+
+_NULL = nullcontext()
+
+class Stats:
+    """call counts and cumulative durations of the phases of capturing and rendering. If disabled, timed() returns a shared
+    no-op context manager and add() returns immediately, so instrumented code only pays for a method call.
+    Image writer threads report as well, so updates are locked"""
+
+    def __init__(self, enabled=True, callback: Callable[[Dict[str, Any]], None] = None) -> None:
+        self.enabled = enabled
+        self.callback = callback
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.times: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.bytes_written: Dict[str, int] = defaultdict(int)
+
+    def timed(self, phase: str):
+        """context manager adding its duration to phase"""
+        if not self.enabled:
+            return _NULL
+        return _Timer(self, phase)
+
+    def add(self, phase: str, seconds: float, count=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.times[phase] += seconds
+            self.counts[phase] += count
+
+    def count(self, name: str, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counts[name] += n
+
+    def written(self, kind: str, n: int):
+        """n bytes of kind ('images' or 'tex') were written"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.bytes_written[kind] += n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'times': dict(self.times),
+                'counts': dict(self.counts),
+                'bytes_written': dict(self.bytes_written)
+            }
+
+    def report(self, **extra):
+        """passes a snapshot with the extra entries to the callback"""
+        if self.enabled and self.callback is not None:
+            self.callback(dict(self.snapshot(), **extra))
+
+# default of all instrumented objects
+DISABLED = Stats(enabled=False)
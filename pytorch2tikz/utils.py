@@ -10,4 +10,10 @@ def rgb_to_hex(rgb):
 
 def hex_to_tex_color(value: str) -> str:
     r,g,b = hex_to_rgb(value)
-    return f'rgb,255:red,{r};green,{g};blue,{b}'
\ No newline at end of file
+    return f'rgb,255:red,{r};green,{g};blue,{b}'
+
+def format_bytes(n: float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n) < 1024 or unit == 'GB':
+            return f'{n:.0f}{unit}' if unit == 'B' else f'{n:.1f}{unit}'
+        n /= 1024
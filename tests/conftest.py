@@ -0,0 +1,34 @@
+import pytest
+from torch import nn
+
+class ConvNet(nn.Module):
+    """conv and linear layers fused with their activations, a pooling gap and an ignored flatten"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.conv1 = nn.Conv2d(3, 8, 3)
+        self.act1 = nn.ReLU()
+        self.pool = nn.MaxPool2d(2)
+        self.conv2 = nn.Conv2d(8, 16, 3)
+        self.act2 = nn.ReLU()
+        self.flatten = nn.Flatten()
+        self.fc = nn.Linear(16 * 5 * 5, 10)
+
+    def forward(self, x):
+        x = self.pool(self.act1(self.conv1(x)))
+        return self.fc(self.flatten(self.act2(self.conv2(x))))
+
+# input shape of ConvNet
+SHAPE = (1, 3, 16, 16)
+
+@pytest.fixture
+def model() -> ConvNet:
+    return ConvNet().eval()
+
+@pytest.fixture
+def shape() -> tuple:
+    return SHAPE
+
+@pytest.fixture
+def image_path(tmp_path) -> str:
+    return str(tmp_path / 'input_{i}.png')
@@ -0,0 +1,84 @@
+import tracemalloc
+import pytest
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.block import D1, D2, D3, Dn, inputs
+from pytorch2tikz.block.abcs import Block, BlockStore, Connection
+from pytorch2tikz.layout import Layout
+
+def test_args_invalidate_tex():
+    block = Block('Conv_1')
+    tex = block.tex
+    assert block.tex is tex
+    block.args['fill'] = '{red}'
+    assert block.tex != tex and 'fill={red}' in block.tex
+    block.args['note'] = 'x'
+    assert 'note=x' in block.tex
+    del block.args['note']
+    assert 'note' not in block.tex
+
+def test_size_invalidates_tex():
+    block = Block('Conv_1', size=(10, 40, 40))
+    tex = block.tex
+    block.size = (10, 20, 20)
+    assert block.tex != tex and 'zlabel=20' in block.tex
+
+def test_layout_invalidates_tex():
+    layout = Layout()
+    first, second = Block('Conv_1'), Block('Conv_2')
+    layout.add(first, (4, 16, 16), 3, (0.0, 0.0, 0.0))
+    layout.add(second, (8, 8, 8), 3, (1.0, 0.0, 0.0))
+    tex = second.tex
+    layout.apply()
+    assert second.tex != tex
+    assert second.tex == Block('Conv_2', scale_factor=second.scale_factor, offset=second.offset).tex
+
+def test_read_only_views():
+    block = Block('Conv_1')
+    with pytest.raises(ValueError):
+        block.offset[0] = 1
+    with pytest.raises(ValueError):
+        block.scale_factor[0] = 1
+
+def test_relayout_renders_cached_blocks(model, shape):
+    arch = Architecture(model).trace(shape)
+    tex = arch.get_tex()
+    assert arch.relayout(target_width=8).get_tex() != tex
+    assert arch.relayout().get_tex() == tex
+
+def test_connection_renamed():
+    first, second = Block('Conv_1'), Block('Conv_2')
+    connection = Connection(first, second)
+    assert '(Conv_2-west)' in connection.tex
+    second.name = 'Conv_3'
+    assert '(Conv_3-west)' in connection.tex
+
+def test_slots():
+    for module in (D1, D2, D3, Dn, inputs):
+        for cls in vars(module).values():
+            if isinstance(cls, type) and issubclass(cls, Block):
+                assert '__dict__' not in dir(cls), cls
+
+def test_store():
+    store = BlockStore(capacity=2)
+    blocks = [Block(f'Conv_{i}', size=(i, 8, 8), offset=(i, 0, 0), store=store) for i in range(5)]
+    assert len(store) == 5 and len(store.offsets) == 8
+    assert [b.size[0] for b in blocks] == list(range(5))
+    assert [b.offset[0] for b in blocks] == list(range(5))
+
+    # a block created outside a sequence moves into its store
+    block = Block('Conv_5', size=(5, 8, 8), offset=(5, 0, 0))
+    block._attach(store)
+    assert block._store is store and store.offsets[5, 0] == 5 and block.size == (5, 8, 8)
+
+def test_memory_per_block():
+    store = BlockStore()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        blocks = [Dn.ConvBlock(i, size=(4, 8, 8), store=store) for i in range(10000)]
+        per_block = (tracemalloc.get_traced_memory()[0] - before) / len(blocks)
+    finally:
+        tracemalloc.stop()
+    # about 1.3 kB before the fields were moved into slots and the store
+    assert per_block < 600
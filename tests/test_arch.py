@@ -0,0 +1,31 @@
+import gzip
+import io
+
+from pytorch2tikz import Architecture
+
+def test_iter_tex(model, shape):
+    arch = Architecture(model).trace(shape)
+    elements = list(arch.iter_tex())
+    assert len(elements) > len(arch._block_sequence.blocks)
+    assert ''.join(elements) == arch.get_tex()
+
+def test_save_stream(model, shape):
+    arch = Architecture(model).trace(shape)
+    out = io.StringIO()
+    arch.save(out)
+    assert out.getvalue() == arch.get_tex()
+
+def test_save_gzip(model, shape, tmp_path):
+    arch = Architecture(model).trace(shape)
+    tex = arch.get_tex()
+
+    arch.save(str(tmp_path / 'out.tex'))
+    assert (tmp_path / 'out.tex').read_text() == tex
+    arch.save(str(tmp_path / 'out.tex.gz'))
+    assert gzip.decompress((tmp_path / 'out.tex.gz').read_bytes()).decode() == tex
+    arch.save(str(tmp_path / 'plain.gz'), compress=False)
+    assert (tmp_path / 'plain.gz').read_text() == tex
+
+    out = io.BytesIO()
+    arch.save(out, compress=True)
+    assert gzip.decompress(out.getvalue()).decode() == tex
@@ -0,0 +1,54 @@
+import os
+import torch
+
+from pytorch2tikz import Architecture
+
+def test_cache_hit(model, shape, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    arch = Architecture(model, cache_dir=cache_dir).trace(shape)
+    hit = Architecture(type(model)(), cache_dir=cache_dir).trace(shape)
+    assert hit._block_sequence._blocks.decoded == 0
+    assert hit.get_tex() == arch.get_tex()
+    # the hooks stay registered as after a cold trace
+    assert len(hit._handles) == len(arch._handles) > 0
+
+def test_relayout_after_cache_hit(model, shape, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    arch = Architecture(model, cache_dir=cache_dir).trace(shape)
+    hit = Architecture(type(model)(), cache_dir=cache_dir).trace(shape)
+    before = hit.get_tex()
+    assert hit.relayout(target_width=8).get_tex() != before
+    assert hit.get_tex() == arch.relayout(target_width=8).get_tex()
+
+def test_recorders_after_cache_hit(model, shape, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    arch = Architecture(model, cache_dir=cache_dir, memory=True).trace(shape)
+    hit = Architecture(type(model)(), cache_dir=cache_dir, memory=True).trace(shape)
+    assert hit._block_sequence._blocks.decoded == 0
+    assert hit.memory_usage('live') == arch.memory_usage('live')
+    assert hit.memory.cumulative == arch.memory.cumulative
+    assert hit._scope_names() == arch._scope_names()
+    assert hit.annotate_memory().get_tex() == arch.annotate_memory().get_tex()
+
+def test_profile_bypasses_cache(model, shape, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    Architecture(model, cache_dir=str(cache_dir), profile=True).trace(shape, device='cpu')
+    assert os.listdir(cache_dir) == []
+
+def test_store_filled_entry(model, shape, tmp_path):
+    arch = Architecture(model, cache_dir=str(tmp_path / 'cache')).trace(shape)
+    key = arch._cache_key(shape, 'meta', torch.float32, 'hook')
+    state, recorders = arch.cache.load(key)
+    # another process stored the entry after load() missed
+    arch.cache.store(key, state, recorders)
+    assert arch.cache.load(key) == (state, recorders)
+
+def test_key_depends_on_input(model, shape, tmp_path):
+    arch = Architecture(model, cache_dir=str(tmp_path / 'cache'))
+    key = arch._cache_key(shape, 'meta', torch.float32, 'hook')
+    assert key == arch._cache_key(shape, torch.device('meta'), torch.float32, 'hook')
+    assert key != arch._cache_key(shape, 'cpu', torch.float32, 'hook')
+    assert key != arch._cache_key((1, 3, 32, 32), 'meta', torch.float32, 'hook')
+    assert key != arch._cache_key(shape, 'meta', torch.float16, 'hook')
+    assert key != arch._cache_key(shape, 'meta', torch.float32, 'fx')
+    assert key != Architecture(model, cache_dir=str(tmp_path / 'cache'), memory=True)._cache_key(shape, 'meta', torch.float32, 'hook')
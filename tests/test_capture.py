@@ -0,0 +1,65 @@
+import gc
+import weakref
+import torch
+
+from pytorch2tikz import Architecture
+
+def names(arch: Architecture):
+    return [b.name for b in arch._block_sequence.blocks]
+
+def test_hooks_match_trace(model, shape, image_path):
+    arch = Architecture(model, image_path=image_path, image_workers=0)
+    with torch.no_grad():
+        model(torch.rand(shape))
+    assert names(arch) == names(Architecture(type(model)()).trace(shape))
+
+def test_max_passes(model, shape, image_path):
+    arch = Architecture(model, image_path=image_path, image_workers=0, capture_once=True)
+    x = torch.rand(shape)
+    with torch.no_grad():
+        model(x)
+        blocks = names(arch)
+        model(x)
+    assert arch.passes == 1 and len(arch._handles) == 0
+    assert names(arch) == blocks
+
+def test_global_hook(model, shape, image_path):
+    x = torch.rand(shape)
+    arch = Architecture(model, image_path=image_path, image_workers=0)
+    with torch.no_grad():
+        model(x)
+    arch.remove_handles()
+
+    arch_global = Architecture(model, image_path=image_path, image_workers=0, global_hook=True)
+    with torch.no_grad():
+        model(x)
+        # modules of other models are not captured
+        type(model)()(x)
+    arch_global.remove_handles()
+    assert arch_global.get_tex() == arch.get_tex()
+
+def test_record_and_build(model, shape, image_path):
+    x = torch.rand(shape)
+    arch = Architecture(model, image_path=image_path, image_workers=0, capture_once=True)
+    recorded = Architecture(model, image_path=image_path, image_workers=0, capture_once=True, record=True)
+    with torch.no_grad():
+        model(x)
+    assert len(recorded._block_sequence.blocks) == 0
+    assert recorded.build().get_tex() == arch.get_tex()
+    # the recorded calls are kept for other settings
+    assert recorded.build(block_offset=4).get_tex() != arch.get_tex()
+    assert recorded.build(block_offset=8).get_tex() == arch.get_tex()
+
+def test_detach(model, shape, image_path):
+    # the fixture keeps its model alive
+    model = type(model)()
+    arch = Architecture(model, image_path=image_path, image_workers=0)
+    with torch.no_grad():
+        model(torch.rand(shape))
+    tex = arch.get_tex()
+    module = weakref.ref(model)
+    arch.detach()
+    del model
+    gc.collect()
+    assert module() is None
+    assert arch.get_tex() == tex
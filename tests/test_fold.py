@@ -0,0 +1,43 @@
+from torch import nn
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.block.tex import RepeatLabel
+from pytorch2tikz.fold import find_repeats
+
+class Stack(nn.Module):
+
+    def __init__(self, depth: int) -> None:
+        super().__init__()
+        self.layers = nn.ModuleList(nn.Sequential(nn.Conv2d(4, 4, 3, padding=1), nn.ReLU()) for _ in range(depth))
+
+    def forward(self, x):
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+def labels(arch: Architecture):
+    return [e for e in arch._block_sequence.folded() if isinstance(e, RepeatLabel)]
+
+def test_find_repeats():
+    assert find_repeats([1, 2, 2, 2, 3]) == [(1, 1, 3)]
+    assert find_repeats([1, 2, 3, 2, 3, 2, 3, 4]) == [(1, 2, 3)]
+    assert find_repeats([1, 2, 3]) == []
+
+def test_fold():
+    arch = Architecture(Stack(6)).trace((1, 4, 8, 8))
+    folded = arch.get_tex(fold=True)
+    assert [l.count for l in labels(arch)] == [6]
+    assert 'ConvAct_2' not in folded
+    assert len(folded) < len(arch.get_tex())
+
+def test_fold_keeps_colors():
+    arch = Architecture(Stack(6)).trace((1, 4, 8, 8))
+    arch.get_block('ConvAct_4').args['fill'] = '{rgb,255:red,255;green,0;blue,0}'
+    assert [l.count for l in labels(arch)] == [3, 2]
+    assert 'red,255' in arch.get_tex(fold=True)
+
+def test_fold_keeps_captions():
+    arch = Architecture(Stack(6)).trace((1, 4, 8, 8))
+    arch.get_block('ConvAct_6').args['caption'] = 'Last'
+    assert [l.count for l in labels(arch)] == [5]
+    assert 'Last' in arch.get_tex(fold=True)
@@ -0,0 +1,92 @@
+import gc
+import torch
+from torch import nn
+import torch.nn.functional as F
+from torchvision.models.resnet import BasicBlock
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.fx import module_calls, trace_graph
+
+class Residual(nn.Module):
+    """residual connections through torch.cat and an addition, which have no block"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.conv1 = nn.Conv2d(3, 4, 3, padding=1)
+        self.conv2 = nn.Conv2d(4, 4, 3, padding=1)
+        self.conv3 = nn.Conv2d(8, 4, 1)
+
+    def forward(self, x):
+        x = self.conv1(x)
+        y = self.conv2(x)
+        return self.conv3(torch.cat([x, y + x], 1))
+
+class FunctionalFirst(nn.Module):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.fc = nn.Linear(8, 4)
+
+    def forward(self, x):
+        return self.fc(F.relu(x))
+
+class Stage(nn.Module):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.conv1 = nn.Conv2d(3, 3, 1)
+        self.conv2 = nn.Conv2d(3, 3, 1)
+
+    def forward(self, x):
+        return self.conv2(F.relu(self.conv1(x)))
+
+class Stages(nn.Module):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.stage = Stage()
+        self.conv = nn.Conv2d(3, 3, 1)
+
+    def forward(self, x):
+        return F.relu(self.conv(self.stage(x)))
+
+def edges(arch: Architecture):
+    return {(c.block1.name, c.block2.name) for c in arch._block_sequence.state()['connections']}
+
+def test_module_calls():
+    model = Residual()
+    calls = list(module_calls(trace_graph(model, torch.zeros(1, 3, 8, 8))))
+    assert [c[0] for c in calls] == [model.conv1, model.conv2, model.conv3]
+    assert calls[2][2].shape == (1, 4, 8, 8)
+    assert calls[2][3] == [model.conv1, model.conv2]
+    assert [c[4] for c in calls] == ['conv1', 'conv2', 'conv3']
+
+    model = Stages()
+    calls = list(module_calls(trace_graph(model, torch.zeros(1, 3, 8, 8))))
+    # the scope of functional ops is the module calling them
+    assert [c[4] for c in calls] == ['stage.conv1', 'stage', 'stage.conv2', 'conv', '']
+
+def test_residual_edges():
+    arch = Architecture(Residual()).trace((1, 3, 8, 8), backend='fx')
+    assert edges(arch) == {('Conv_1', 'Conv_3')}
+
+def test_functional_first():
+    arch = Architecture(FunctionalFirst()).trace((1, 8), backend='fx')
+    # the connection of the input to the stand-in of F.relu is resolved after the trace
+    gc.collect()
+    assert [b.name for b in arch._block_sequence.blocks] == ['VecInput_1', 'Act_1', 'Linear_2']
+    assert edges(arch) == {('VecInput_1', 'Act_1'), ('Act_1', 'Linear_2')}
+
+def test_basic_block():
+    downsample = nn.Sequential(nn.Conv2d(8, 16, 1, stride=2), nn.BatchNorm2d(16))
+    model = BasicBlock(8, 16, stride=2, downsample=downsample).eval()
+    hook = Architecture(model).trace((1, 8, 16, 16))
+    fx = Architecture(model).trace((1, 8, 16, 16), backend='fx')
+    assert len(edges(hook)) > 0
+    assert edges(fx) == edges(hook)
+
+def test_max_depth():
+    arch = Architecture(Stages(), max_depth=1).trace((1, 3, 8, 8), backend='fx')
+    # F.relu inside the stage does not split its group
+    assert [b.name for b in arch._block_sequence.blocks] == ['ImgInput_1', 'Module_1', 'ConvAct_2']
+    assert arch.get_block('Module_1').args['caption'] == 'Stage'
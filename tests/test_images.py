@@ -0,0 +1,102 @@
+import math
+import os
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.images import ImageWriter, downscale, pack, printed_size
+
+class Target:
+    """stands in for an ImgInputBlock"""
+    file_path = None
+    viewport = None
+
+def pixels(path) -> np.ndarray:
+    return np.asarray(Image.open(path))
+
+def test_write_async(tmp_path):
+    writer = ImageWriter(max_workers=2)
+    x = torch.rand(3, 8, 8)
+    expected = x.clone()
+    target = Target()
+    writer.submit(x, str(tmp_path / 'a.png'), target)
+    # the input may be changed by later layers
+    x.zero_()
+    assert len(writer) == 1
+    writer.wait()
+    assert len(writer) == 0 and target.file_path == 'a.png'
+
+    immediate = ImageWriter(max_workers=0)
+    immediate.submit(expected, str(tmp_path / 'b.png'))
+    assert len(immediate) == 0
+    assert np.array_equal(pixels(tmp_path / 'a.png'), pixels(tmp_path / 'b.png'))
+    writer.close()
+
+def test_wait_raises(tmp_path):
+    writer = ImageWriter(max_workers=1)
+    writer.submit(torch.rand(3, 8, 8), str(tmp_path / 'missing' / 'a.png'))
+    with pytest.raises(OSError):
+        writer.wait()
+    writer.close()
+
+def test_capture_writes_images(model, shape, image_path, tmp_path):
+    arch = Architecture(model, image_path=image_path)
+    with torch.no_grad():
+        model(torch.rand(shape))
+    # rendering waits for the images
+    assert 'input_1.png' in arch.get_tex()
+    assert os.path.isfile(tmp_path / 'input_1.png')
+    arch.close()
+
+def test_downscale():
+    x = torch.rand(3, 400, 200)
+    height, width = printed_size(x)
+    small = downscale(x, dpi=10)
+    assert small.shape == (3, math.ceil(height / 2.54 * 10), math.ceil(width / 2.54 * 10))
+    assert downscale(x, dpi=10000) is x
+
+def test_pack():
+    shapes = [(4, 6), (8, 2), (3, 3), (8, 8), (1, 9)]
+    corners, (height, width) = pack(shapes)
+    atlas = np.zeros((height, width), dtype=int)
+    for (top, left), (h, w) in zip(corners, shapes):
+        atlas[top:top + h, left:left + w] += 1
+    # rectangles are inside the atlas and do not overlap
+    assert atlas.max() == 1 and atlas.sum() == sum(h * w for h, w in shapes)
+
+def test_dedupe(tmp_path):
+    writer = ImageWriter(max_workers=2, dedupe=True)
+    x = torch.rand(3, 8, 8)
+    targets = [Target() for _ in range(3)]
+    writer.submit(x, str(tmp_path / 'a.png'), targets[0])
+    writer.submit(x.clone(), str(tmp_path / 'b.png'), targets[1])
+    writer.submit(torch.rand(3, 8, 8), str(tmp_path / 'c.png'), targets[2])
+    writer.close()
+    assert [t.file_path for t in targets] in (['a.png', 'a.png', 'c.png'], ['b.png', 'b.png', 'c.png'])
+    assert len(os.listdir(tmp_path)) == 2
+
+def test_atlas(tmp_path):
+    writer = ImageWriter(max_workers=0, atlas=str(tmp_path / 'atlas.png'))
+    images = [torch.rand(3, 8, 8), torch.rand(1, 4, 6)]
+    targets = [Target(), Target()]
+    for i, (x, target) in enumerate(zip(images, targets)):
+        writer.submit(x, str(tmp_path / f'{i}.png'), target)
+    writer.wait()
+    assert os.listdir(tmp_path) == ['atlas.png']
+
+    height = pixels(tmp_path / 'atlas.png').shape[0]
+    for x, target in zip(images, targets):
+        assert target.file_path == 'atlas.png'
+        left, bottom, right, top = target.viewport
+        assert (top - bottom, right - left) == tuple(x.shape[-2:])
+        assert 0 <= bottom and top <= height
+
+def test_atlas_tex(model, shape, tmp_path):
+    arch = Architecture(model, image_path=str(tmp_path / 'input_{i}.png'), image_atlas=True, image_dpi=30)
+    with torch.no_grad():
+        model(torch.rand(shape))
+    tex = arch.get_tex()
+    assert 'input_atlas.png' in tex and 'viewport' in tex
+    assert os.listdir(tmp_path) == ['input_atlas.png']
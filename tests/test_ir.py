@@ -0,0 +1,57 @@
+import io
+import json
+import pytest
+
+from pytorch2tikz import Architecture, ir
+
+def dumped(arch: Architecture) -> io.BytesIO:
+    f = io.BytesIO()
+    arch.dump_ir(f)
+    f.seek(0)
+    return f
+
+def test_round_trip(model, shape):
+    arch = Architecture(model).trace(shape)
+    loaded = Architecture.from_ir(dumped(arch))
+    assert loaded.get_tex() == arch.get_tex()
+
+def test_lazy_decoding(model, shape):
+    loaded = Architecture.from_ir(dumped(Architecture(model).trace(shape)))
+    blocks = loaded._block_sequence._blocks
+    assert blocks.decoded == 0
+    loaded.get_block('ConvAct_1')
+    assert blocks.decoded == 1
+
+def test_relayout_after_load(model, shape):
+    arch = Architecture(model).trace(shape)
+    loaded = Architecture.from_ir(dumped(arch))
+    before = loaded.get_tex()
+    loaded.relayout(target_width=8)
+    assert loaded.get_tex() != before
+    assert loaded.get_tex() == arch.relayout(target_width=8).get_tex()
+
+def test_remove_block_after_load(model, shape):
+    arch = Architecture(model).trace(shape)
+    loaded = Architecture.from_ir(dumped(arch))
+    arch.remove_block('Pool_2')
+    loaded.remove_block('Pool_2')
+    # removing a block does not decode the other blocks
+    assert loaded._block_sequence._blocks.decoded == 0
+    assert loaded.relayout(target_width=8).get_tex() == arch.relayout(target_width=8).get_tex()
+    assert Architecture.from_ir(dumped(loaded)).relayout(target_width=8).get_tex() == arch.get_tex()
+
+def test_relayout_without_layout(model, shape):
+    state = json.load(dumped(Architecture(model).trace(shape)))
+    state['version'] = 1
+    del state['layout']
+    loaded = Architecture(None)
+    ir.decode(state, loaded._block_sequence)
+    loaded.get_tex()
+    with pytest.raises(RuntimeError):
+        loaded.relayout()
+
+def test_newer_version(model, shape):
+    state = json.load(dumped(Architecture(model).trace(shape)))
+    state['version'] = ir.IR_VERSION + 1
+    with pytest.raises(ValueError):
+        ir.decode(state, Architecture(None)._block_sequence)
@@ -0,0 +1,52 @@
+import random
+import pytest
+import torch
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.latency import LatencyStats, colormap
+
+def test_colormap():
+    assert colormap('gray', 0.0) == '#f0f0f0'
+    assert colormap('gray', 1.0) == '#202020'
+    assert colormap('gray', 0.5) == '#888888'
+    # values are clipped to [0, 1]
+    assert colormap(['#000000', '#ffffff'], 2.0) == '#ffffff'
+    assert colormap('heat', 1 / 7) == '#ffeda0'
+
+def test_reservoir():
+    stats = LatencyStats(reservoir=100)
+    rng = random.Random(0)
+    for i in range(10000):
+        stats.add(float(i), rng)
+    assert stats.count == 10000 and len(stats.samples) == 100
+    assert stats.get('mean') == pytest.approx(4999.5)
+    assert stats.get('total') == sum(range(10000))
+    # the sample is uniform over all calls
+    assert 3000 < stats.get('p50') < 7000
+    with pytest.raises(ValueError):
+        stats.get('median')
+
+def test_heatmap(model, shape):
+    arch = Architecture(model, profile=True).trace(shape, device='cpu')
+    with torch.no_grad():
+        model(torch.rand(shape))
+    latencies = arch.latencies()
+    assert {'ConvAct_1', 'ConvAct_3', 'Linear_4'} <= set(latencies.keys())
+
+    arch.heatmap(colormap='gray')
+    slowest = max(latencies, key=latencies.get)
+    assert arch.get_block(slowest).args['fill'] == '{rgb,255:red,32;green,32;blue,32}'
+    assert sum(float(arch.get_block(name).args['caption'].split()[-1][:-2]) for name in latencies) == pytest.approx(100, abs=0.5)
+
+def test_heatmap_skips_unknown_blocks(model, shape):
+    arch = Architecture(model).trace(shape)
+    with pytest.warns(UserWarning, match='Pool_9'):
+        arch.heatmap(latencies={'ConvAct_1': 1.0, 'Pool_9': 2.0}, colormap=lambda v: '#000000')
+    assert arch.get_block('ConvAct_1').args['fill'] == '{rgb,255:red,0;green,0;blue,0}'
+
+def test_annotate_memory_after_remove(model, shape):
+    arch = Architecture(model, memory=True).trace(shape)
+    arch.remove_block('Pool_2')
+    with pytest.warns(UserWarning, match='Pool_2'):
+        arch.annotate_memory()
+    assert 'params' in arch.get_block('ConvAct_1').args['caption']
@@ -0,0 +1,33 @@
+import numpy as np
+
+from pytorch2tikz.layout import Layout
+
+class Block:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.args = {'width': 4}
+
+def build(shapes) -> Layout:
+    layout = Layout()
+    for i, shape in enumerate(shapes):
+        layout.add(Block(f'Conv_{i}'), shape, 3, (1.0, 0.0, 0.0))
+    return layout
+
+def test_remove():
+    shapes = [(4, 16, 16), (8, 8, 8), (16, 4, 4), (32, 2, 2)]
+    layout = build(shapes)
+    layout.remove(layout.blocks[1])
+    layout.remove(layout.blocks[3])
+    # removed rows are kept until the next compute
+    assert len(layout.blocks) == 4 and len(layout) == 2
+
+    expected = build([shapes[0], shapes[2]]).compute(target_width=10)
+    for a, b in zip(layout.compute(target_width=10), expected):
+        assert np.array_equal(a, b)
+    assert [b.name for b in layout.blocks] == ['Conv_0', 'Conv_2']
+
+    layout.remove(layout.blocks[1])
+    layout.add(Block('Conv_4'), shapes[3], 3, (1.0, 0.0, 0.0))
+    layout.compute()
+    assert [b.name for b in layout.placed] == ['Conv_0', 'Conv_4']
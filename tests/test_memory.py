@@ -0,0 +1,60 @@
+import pytest
+import torch
+from torch import nn
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.memory import output_bytes, timeline
+
+class Net(nn.Module):
+
+    def __init__(self, inplace: bool) -> None:
+        super().__init__()
+        self.conv = nn.Conv2d(3, 4, 3)
+        self.act = nn.ReLU(inplace=inplace)
+        self.flatten = nn.Flatten()
+        self.fc = nn.Linear(4 * 6 * 6, 10)
+
+    def forward(self, x):
+        return self.fc(self.flatten(self.act(self.conv(x))))
+
+class EmbeddingNet(nn.Module):
+    """the output of the embedding has another dtype than its input"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.embedding = nn.Embedding(10, 8)
+        self.fc = nn.Linear(8, 4)
+
+    def forward(self, x):
+        return self.fc(self.embedding(x))
+
+def test_output_bytes():
+    x = torch.rand(4, 4)
+    assert output_bytes([x.relu()], [x]) == 64
+    assert output_bytes([x.relu_()], [x]) == 0
+    assert output_bytes([x.view(16)], [x]) == 0
+    y = x + 1
+    assert output_bytes([y, y.t()], []) == 64
+
+def test_output_bytes_meta():
+    x = torch.empty(4, 4, device='meta')
+    assert output_bytes([x.relu()], [x]) == 64
+    assert output_bytes([x.view(16)], [x]) == 0
+
+@pytest.mark.parametrize('device', ['meta', 'cpu'])
+@pytest.mark.parametrize('backend', ['hook', 'fx'])
+def test_inplace_outputs(device, backend):
+    conv, fc = 4 * 6 * 6 * 4, 10 * 4
+    for inplace, expected in [(False, 2 * conv + fc), (True, conv + fc)]:
+        arch = Architecture(Net(inplace), memory=True).trace((1, 3, 8, 8), device=device, backend=backend)
+        assert arch.memory.cumulative == expected
+
+def test_output_dtype():
+    hook, fx = (Architecture(EmbeddingNet(), memory=True).trace((2, 5), dtype=torch.long, backend=backend) for backend in ('hook', 'fx'))
+    assert hook.memory.cumulative == 2 * 5 * (8 + 4) * 4
+    assert fx.memory_usage() == hook.memory_usage()
+
+def test_timeline():
+    calls = [(0, 10, ()), (1, 5, (0,)), (2, 7, (1,)), (3, 1, (0, 2))]
+    assert timeline(calls, 'cumulative') == [10, 15, 22, 23]
+    assert timeline(calls, 'live') == [10, 15, 22, 18]
@@ -0,0 +1,54 @@
+import torch
+from torch import nn
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.module_graph import module_graph
+
+def test_cached(model):
+    graph = module_graph(model)
+    assert module_graph(model) is graph
+    assert graph.find('conv1').module is model.conv1
+    assert graph.node(model.fc).depth == 1
+
+def test_replaced_submodule(model):
+    graph = module_graph(model)
+    old = model.fc
+    model.fc = nn.Linear(16 * 5 * 5, 10)
+    rebuilt = module_graph(model)
+    assert rebuilt is not graph
+    assert rebuilt.node(model.fc) is not None and rebuilt.node(old) is None
+
+def test_added_and_removed_submodule(model):
+    graph = module_graph(model)
+    model.extra = nn.ReLU()
+    added = module_graph(model)
+    assert added is not graph and added.find('extra') is not None
+
+    del model.extra
+    removed = module_graph(model)
+    assert removed is not added and removed.find('extra') is None
+    assert removed.fingerprint == graph.fingerprint
+
+def test_nested_change(model):
+    model.block = nn.Sequential(nn.Conv2d(3, 3, 1))
+    graph = module_graph(model)
+    # children of an nn.Sequential are children of its parent
+    assert graph.find('block.0').parent is graph.root
+    model.block[0] = nn.Conv2d(3, 3, 3)
+    assert module_graph(model).node(model.block[0]) is not None
+
+def test_deep_model():
+    model = nn.Module()
+    module = model
+    for _ in range(5000):
+        module.child = nn.Module()
+        module = module.child
+    assert len(module_graph(model).levels) == 5001
+
+def test_hooks_follow_replaced_module(model, shape, image_path):
+    module_graph(model)
+    model.fc = nn.Linear(16 * 5 * 5, 4)
+    arch = Architecture(model, image_path=image_path, image_workers=0)
+    with torch.no_grad():
+        model(torch.rand(shape))
+    assert arch.get_block('Linear_4').args['depth'] == 4
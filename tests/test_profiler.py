@@ -0,0 +1,38 @@
+import io
+import json
+import pytest
+import torch
+from torch.profiler import profile, record_function
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.profiler import iter_trace_events
+
+def test_iter_trace_events():
+    events = [{'name': f'op{i}', 'ph': 'X', 'dur': i} for i in range(100)]
+    data = json.dumps({'schemaVersion': 1, 'traceEvents': events})
+    assert list(iter_trace_events(io.StringIO(data), chunk_size=7)) == events
+    assert list(iter_trace_events(io.StringIO(json.dumps(events)), chunk_size=7)) == events
+
+def test_trace(model, shape, tmp_path):
+    arch = Architecture(model).trace(shape)
+    with torch.no_grad(), profile(with_stack=True) as prof:
+        model(torch.rand(shape))
+    path = str(tmp_path / 'trace.json')
+    prof.export_chrome_trace(path)
+
+    times = arch.import_profile(path)
+    assert {'ConvAct_1', 'ConvAct_3', 'Linear_4'} <= set(times.keys())
+    assert all(t > 0 for t in times.values())
+
+def test_averages_need_scopes(model, shape):
+    arch = Architecture(model).trace(shape)
+    x = torch.rand(shape)
+    with torch.no_grad(), profile(with_stack=True) as prof:
+        model(x)
+    with pytest.warns(UserWarning):
+        assert arch.import_profile(prof.key_averages()) == {}
+
+    with torch.no_grad(), profile() as prof:
+        with record_function('conv1'):
+            model.conv1(x)
+    assert list(arch.import_profile(prof.key_averages()).keys()) == ['ConvAct_1']
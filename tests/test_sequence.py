@@ -0,0 +1,100 @@
+import warnings
+import torch
+from torch import nn
+import torch.nn.functional as F
+
+from pytorch2tikz import Architecture
+
+class FunctionalNet(nn.Module):
+    """conv and linear modules with functional activations, so several fuseable modules are buffered in a row"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.conv1 = nn.Conv2d(3, 4, 3)
+        self.conv2 = nn.Conv2d(4, 4, 3)
+        self.conv3 = nn.Conv2d(4, 4, 1)
+        self.fc = nn.Linear(64, 10)
+
+    def forward(self, x):
+        x = F.relu(self.conv1(x))
+        x = F.relu(self.conv2(x))
+        x = x + self.conv3(x)
+        return self.fc(x.flatten(1))
+
+class Net(nn.Module):
+    """the root module is hooked as well, so it must not be a torch.nn container"""
+
+    def __init__(self, *layers: nn.Module) -> None:
+        super().__init__()
+        self.layers = nn.Sequential(*layers)
+
+    def forward(self, x):
+        return self.layers(x)
+
+def names(arch: Architecture):
+    return [b.name for b in arch._block_sequence.blocks]
+
+def test_fuse_pairs(tmp_path):
+    model = Net(nn.Conv2d(3, 4, 3), nn.ReLU(), nn.Flatten(), nn.Linear(144, 10), nn.ReLU(), nn.Linear(10, 2))
+    arch = Architecture(model, image_path=str(tmp_path / 'input_{i}.png'), image_workers=0)
+    model(torch.rand(1, 3, 8, 8))
+    assert names(arch) == ['ImgInput_1', 'ConvAct_1', 'LinearAct_2', 'Linear_3']
+
+def test_flush_without_activation_modules(tmp_path):
+    model = FunctionalNet()
+    arch = Architecture(model, image_path=str(tmp_path / 'input_{i}.png'), image_workers=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        model(torch.rand(1, 3, 8, 8))
+    assert names(arch) == ['ImgInput_1', 'Conv_1', 'Conv_2', 'Conv_3', 'Linear_4']
+
+def test_flush_fx():
+    arch = Architecture(FunctionalNet()).trace((1, 3, 8, 8), backend='fx')
+    assert names(arch) == ['ImgInput_1', 'ConvAct_1', 'ConvAct_2', 'Conv_3', 'Linear_4']
+
+def test_unmapped_layer_does_not_break_forward(tmp_path):
+    # LayerNorm has no block
+    model = Net(nn.Conv2d(3, 4, 3), nn.ReLU(), nn.LayerNorm([4, 6, 6]), nn.Flatten(), nn.Linear(144, 10), nn.LayerNorm(10))
+    arch = Architecture(model, image_path=str(tmp_path / 'input_{i}.png'), image_workers=0)
+    x = torch.rand(1, 3, 8, 8)
+    with warnings.catch_warnings(record=True) as caught, arch.capture():
+        warnings.simplefilter('always')
+        out = model(x)
+        model(x)
+    assert torch.equal(out, model(x))
+    assert len(caught) == 1 and 'LayerNorm' in str(caught[0].message)
+    assert names(arch) == ['ImgInput_1', 'ConvAct_1', 'Linear_2']
+
+def test_max_depth():
+    model = Net(nn.Conv2d(3, 4, 3), nn.ReLU(), nn.Flatten(), nn.Linear(144, 10))
+    arch = Architecture(model, max_depth=0).trace((1, 3, 8, 8))
+    blocks = [b for b in arch._block_sequence.blocks if b.name != 'ImgInput_1']
+    assert len(blocks) == 1 and blocks[0].args['caption'] == 'Net'
+
+def edges(arch: Architecture):
+    """connections by block names, checked against the adjacency sets of the sequence"""
+    sequence = arch._block_sequence
+    pairs = {(c.block1.name, c.block2.name) for c in sequence.state()['connections']}
+    names = {i: name for name, i in sequence._ids.items()}
+    assert {(names[i], names[j]) for i, out in sequence._out.items() for j in out} == pairs
+    assert {(names[i], names[j]) for j, into in sequence._in.items() for i in into} == pairs
+    return pairs
+
+def test_connect(model, shape):
+    arch = Architecture(model).trace(shape)
+    chain = edges(arch)
+    arch.connect('ConvAct_1', 'Linear_4')
+    arch.connect('ConvAct_1', 'Linear_4')
+    assert edges(arch) == chain | {('ConvAct_1', 'Linear_4')}
+    arch.remove_connection('ConvAct_1', 'Linear_4')
+    assert edges(arch) == chain
+
+def test_remove_block(model, shape):
+    arch = Architecture(model).trace(shape)
+    arch.connect('ConvAct_1', 'Linear_4')
+    arch.connect('Linear_4', 'Pool_2')
+    arch.remove_block('Pool_2')
+    assert 'Pool_2' not in names(arch)
+    assert edges(arch) == {('ConvAct_3', 'Linear_4'), ('ConvAct_1', 'Linear_4')}
+    arch.remove_block('Linear_4')
+    assert edges(arch) == set()
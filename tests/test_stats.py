@@ -0,0 +1,58 @@
+import io
+import os
+import torch
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.stats import DISABLED, Stats
+
+def test_counters():
+    stats = Stats()
+    with stats.timed('hook'):
+        pass
+    stats.add('hook', 1.0, count=2)
+    stats.count('classify')
+    stats.written('tex', 10)
+    snapshot = stats.snapshot()
+    assert snapshot['counts'] == {'hook': 3, 'classify': 1}
+    assert snapshot['times']['hook'] >= 1.0
+    assert snapshot['bytes_written'] == {'tex': 10}
+
+    stats.reset()
+    assert stats.snapshot() == {'times': {}, 'counts': {}, 'bytes_written': {}}
+
+def test_disabled():
+    DISABLED.add('hook', 1.0)
+    DISABLED.count('classify')
+    DISABLED.written('tex', 10)
+    assert DISABLED.timed('hook') is DISABLED.timed('tex')
+    assert DISABLED.snapshot() == {'times': {}, 'counts': {}, 'bytes_written': {}}
+
+def test_capture(model, shape, image_path):
+    reports = []
+    arch = Architecture(model, image_path=image_path, image_workers=0, stats_callback=reports.append)
+    with torch.no_grad():
+        model(torch.rand(shape))
+        model(torch.rand(shape))
+    stats = arch.stats()
+    # conv1, act1, pool, conv2, act2, flatten and fc are hooked on each pass
+    assert stats['counts']['hook'] == 14
+    # each module class is classified once
+    assert stats['counts']['classify'] == len({type(m) for m in model.modules()})
+    assert stats['passes'] == 2 == len(reports) and reports[-1]['passes'] == 2
+    assert stats['blocks'] == len(arch._block_sequence.blocks)
+    assert stats['bytes_written']['images'] == os.path.getsize(image_path.replace('{i}', '1'))
+
+    arch.stats(reset=True)
+    assert arch.stats()['counts'] == {}
+
+def test_tex_bytes(model, shape, tmp_path):
+    arch = Architecture(model, collect_stats=True).trace(shape)
+    for name in ('out.tex', 'out.tex.gz'):
+        arch.stats(reset=True)
+        arch.save(str(tmp_path / name))
+        assert arch.stats()['bytes_written']['tex'] == os.path.getsize(tmp_path / name)
+
+    arch.stats(reset=True)
+    out = io.BytesIO()
+    arch.save(out, compress=True)
+    assert arch.stats()['bytes_written']['tex'] == len(out.getvalue())
@@ -0,0 +1,33 @@
+import torch
+from torch import nn
+
+from pytorch2tikz import Architecture
+from pytorch2tikz.block.inputs import ImgInputBlock
+
+class Net(nn.Module):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.conv = nn.Conv2d(3, 4, 3)
+        self.act = nn.ReLU()
+        self.register_buffer('scale', torch.ones(1))
+
+    def forward(self, x):
+        return self.act(self.conv(x)) * self.scale
+
+def test_trace_keeps_module():
+    model = Net()
+    weight = model.conv.weight
+    data = weight.detach().clone()
+    Architecture(model).trace((1, 3, 8, 8))
+    assert model.conv.weight is weight
+    assert model.conv.weight.device == torch.device('cpu')
+    assert model.scale.device == torch.device('cpu')
+    assert torch.equal(model.conv.weight, data)
+
+def test_synthetic_inputs_have_no_images(tmp_path):
+    arch = Architecture(Net(), image_path=str(tmp_path / 'input_{i}.png')).trace((1, 3, 8, 8), device='cpu')
+    inputs = [b for b in arch._block_sequence.blocks if isinstance(b, ImgInputBlock)]
+    assert len(inputs) == 1 and inputs[0].file_path is None
+    arch.images.wait()
+    assert list(tmp_path.glob('*.png')) == []